@@ -0,0 +1,105 @@
+"""
+Host side display benchmark.
+
+Runs the controller's display code unchanged against the emulated panel
+and prints the SPI traffic of every frame.
+
+Usage:
+
+    python host/bench.py [scene] [--frames N] [--png out.png]
+
+Scenes:
+
+    gamepad   modules/lcd.py show_gamepad() with changing stick values
+    fill      full screen fills
+    shapes    lines and polygons
+"""
+
+import builtins
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+# host modules first so `machine` resolves to the stand-in
+sys.path[:0] = [HERE, ROOT, os.path.join(ROOT, "lib")]
+
+# viper pointer types used by st7789py's glyph packers
+builtins.ptr8 = memoryview
+builtins.ptr16 = lambda buf: memoryview(buf).cast("H")
+
+import machine
+from st7789_emu import ST7789Emulator
+
+
+def scene_gamepad(frame):
+    import modules.lcd as lcd
+
+    data = [1, frame % 256, 255 - frame % 256, 127, 127, 8, 0, 6]
+    lcd.show_gamepad(data, 1_000_000 + frame * 1000, frame * 100)
+
+
+def scene_fill(frame):
+    import modules.lcd as lcd
+
+    lcd.tft.fill((frame * 0x0841) & 0xFFFF)
+
+
+def scene_shapes(frame):
+    import modules.lcd as lcd
+
+    tft = lcd.tft
+    arrow = [(0, -40), (15, 20), (0, 10), (-15, 20)]
+    tft.fill_rect(60, 60, 120, 120, 0)
+    tft.fill_polygon(arrow, 120, 120, 0xFFE0, angle=frame * 0.1)
+    tft.line(0, frame % 240, 239, 239 - frame % 240, 0x07FF)
+
+
+SCENES = {
+    "gamepad": scene_gamepad,
+    "fill": scene_fill,
+    "shapes": scene_shapes,
+}
+
+
+def main(argv):
+    scene = "gamepad"
+    frames = 10
+    png = None
+    args = iter(argv)
+    for arg in args:
+        if arg == "--frames":
+            frames = int(next(args))
+        elif arg == "--png":
+            png = next(args)
+        else:
+            scene = arg
+
+    emu = ST7789Emulator()
+    machine.attach(emu)
+
+    import modules.lcd  # noqa: F401  display init and splash text
+
+    boot = emu.frame()
+    print(f"init: {boot}")
+
+    draw = SCENES[scene]
+    for frame in range(frames):
+        draw(frame)
+        emu.frame()
+
+    print(f"{'frame':>5} {'trans':>7} {'writes':>7} {'cmds':>6} {'cmd B':>7} {'pixel B':>8}")
+    for n, stats in enumerate(emu.frames[1:]):
+        print(
+            f"{n:>5} {stats['transactions']:>7} {stats['writes']:>7} {stats['commands']:>6}"
+            f" {stats['command_bytes']:>7} {stats['pixel_bytes']:>8}"
+        )
+
+    if png:
+        emu.save_png(png)
+        print(f"saved {png}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
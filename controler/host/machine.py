@@ -0,0 +1,90 @@
+"""
+Host stand-in for the parts of MicroPython's `machine` module used by the
+display code (Pin and SPI), so lib/tft_config.py and modules/lcd.py run
+unchanged on Linux. SPI writes are forwarded to the devices attached with
+`attach()`, e.g. st7789_emu.ST7789Emulator.
+"""
+
+_levels = {}    # pin id -> level
+_watchers = {}  # pin id -> [callback(level)]
+_devices = []   # devices attached to the SPI buses
+
+
+def attach(device):
+    """Attach an emulated device, it receives every SPI write on its bus."""
+    _devices.append(device)
+    for pin, callback in device.watch():
+        _watchers.setdefault(pin, []).append(callback)
+
+
+def detach(device):
+    """Detach a device attached with attach()."""
+    _devices.remove(device)
+    for pin, callback in device.watch():
+        _watchers[pin].remove(callback)
+
+
+class Pin:
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 2
+    PULL_DOWN = 1
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.init(mode, pull, value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if value is not None:
+            self.value(value)
+        else:
+            _levels.setdefault(self.id, 1 if pull == self.PULL_UP else 0)
+
+    @staticmethod
+    def level(id):
+        """Current level of the pin with the given id."""
+        return _levels.get(id, 0)
+
+    def value(self, value=None):
+        if value is None:
+            return _levels.get(self.id, 0)
+
+        value = 1 if value else 0
+        if _levels.get(self.id) != value:
+            _levels[self.id] = value
+            for callback in _watchers.get(self.id, ()):
+                callback(value)
+
+    def __call__(self, value=None):
+        return self.value(value)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        return None
+
+
+class SPI:
+    def __init__(self, id, baudrate=1_000_000, polarity=0, phase=0,
+                 sck=None, mosi=None, miso=None, **kwargs):
+        self.id = id
+        self.baudrate = baudrate
+
+    def init(self, baudrate=None, **kwargs):
+        if baudrate is not None:
+            self.baudrate = baudrate
+
+    def deinit(self):
+        pass
+
+    def write(self, buf):
+        for device in _devices:
+            if device.bus == self.id:
+                device.spi_write(buf)
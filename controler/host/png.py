@@ -0,0 +1,36 @@
+"""Minimal pure Python PNG writer for 8 bit RGB images."""
+
+import struct
+import zlib
+
+
+def _chunk(kind, data):
+    return (
+        struct.pack(">I", len(data))
+        + kind
+        + data
+        + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+    )
+
+
+def write_png(path, width, height, rgb):
+    """
+    Write an RGB image to a PNG file.
+
+    Args:
+        path (str): file to write
+        width (int): image width
+        height (int): image height
+        rgb (bytes): width * height * 3 bytes, row by row
+    """
+    stride = width * 3
+    raw = bytearray()
+    for row in range(height):
+        raw.append(0)  # filter type: none
+        raw += rgb[row * stride : (row + 1) * stride]
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(_chunk(b"IDAT", zlib.compress(bytes(raw), 6)))
+        f.write(_chunk(b"IEND", b""))
@@ -0,0 +1,246 @@
+"""
+ST7789 panel emulator for host side display benchmarks.
+
+The emulator sits on an emulated SPI bus (see machine.py), decodes the
+commands the driver sends (CASET, RASET, RAMWR, MADCTL, VSCRDEF, VSCSAD)
+into an RGB565 frame memory and counts the traffic per frame:
+
+- transactions: CS assertions
+- writes: SPI write calls
+- commands: command bytes
+- command_bytes: command and parameter bytes, RAMWR data excluded
+- pixel_bytes: RAMWR data bytes
+
+Colors are captured as the driver meant them, the BGR and inversion
+settings are recorded but not applied.
+"""
+
+from array import array
+import struct
+import sys
+
+from png import write_png
+
+_CASET = 0x2A
+_RASET = 0x2B
+_RAMWR = 0x2C
+_INVOFF = 0x20
+_INVON = 0x21
+_VSCRDEF = 0x33
+_MADCTL = 0x36
+_VSCSAD = 0x37
+
+_MY = 0x80
+_MX = 0x40
+_MV = 0x20
+
+_COUNTERS = ("transactions", "writes", "commands", "command_bytes", "pixel_bytes")
+
+
+class ST7789Emulator:
+    """
+    Emulated ST7789 frame memory.
+
+    Args:
+        bus (int): SPI bus id the panel is on
+        dc (int): dc pin id
+        cs (int): cs pin id, None if CS is not wired
+        width (int): frame memory width
+        height (int): frame memory height
+        visible (tuple): (width, height) of the visible area
+    """
+
+    def __init__(self, bus=2, dc=38, cs=39, width=240, height=320, visible=(240, 240)):
+        self.bus = bus
+        self.dc = dc
+        self.cs = cs
+        self.width = width
+        self.height = height
+        self.visible = visible
+
+        self.gram = array("H", bytes(width * height * 2))
+        self.madctl = 0
+        self.inverted = False
+        self.columns = (0, width - 1)
+        self.rows = (0, height - 1)
+        self.scroll = (0, height, 0)
+        self.vssa = 0
+
+        self._command = None
+        self._params = bytearray()
+        self._col = 0
+        self._row = 0
+        self._odd = b""
+
+        self.counters = dict.fromkeys(_COUNTERS, 0)
+        self.totals = dict.fromkeys(_COUNTERS, 0)
+        self.frames = []
+
+    def watch(self):
+        """Pins the emulator needs to hear about, see machine.attach()."""
+        return ((self.cs, self._cs_changed),) if self.cs is not None else ()
+
+    def _selected(self):
+        import machine
+
+        return self.cs is None or not machine.Pin.level(self.cs)
+
+    def _cs_changed(self, level):
+        if not level:
+            self._count("transactions", 1)
+
+    def _count(self, name, value):
+        self.counters[name] += value
+        self.totals[name] += value
+
+    def spi_write(self, buf):
+        """Receive one SPI write from the bus."""
+        import machine
+
+        if not self._selected():
+            return
+
+        data = bytes(buf)
+        self._count("writes", 1)
+        if not machine.Pin.level(self.dc):
+            for command in data:
+                self._begin(command)
+        elif self._command == _RAMWR:
+            self._count("pixel_bytes", len(data))
+            self._pixels(data)
+        else:
+            self._count("command_bytes", len(data))
+            self._params += data
+            self._apply()
+
+    def _begin(self, command):
+        self._count("commands", 1)
+        self._count("command_bytes", 1)
+        self._command = command
+        self._params = bytearray()
+        self._odd = b""
+        if command == _RAMWR:
+            self._col = self.columns[0]
+            self._row = self.rows[0]
+        elif command == _INVON:
+            self.inverted = True
+        elif command == _INVOFF:
+            self.inverted = False
+
+    def _apply(self):
+        command = self._command
+        params = self._params
+        if command in (_CASET, _RASET) and len(params) >= 4:
+            start, end = struct.unpack(">HH", params[:4])
+            if command == _CASET:
+                self.columns = (start, end)
+            else:
+                self.rows = (start, end)
+        elif command == _MADCTL and params:
+            self.madctl = params[0]
+        elif command == _VSCRDEF and len(params) >= 6:
+            self.scroll = struct.unpack(">HHH", params[:6])
+        elif command == _VSCSAD and len(params) >= 2:
+            self.vssa = struct.unpack(">H", params[:2])[0]
+
+    def _index(self, col, row):
+        """Frame memory index of a pixel in driver coordinates, or None."""
+        madctl = self.madctl
+        if madctl & _MV:
+            col, row = row, col
+        if madctl & _MX:
+            col = self.width - 1 - col
+        if madctl & _MY:
+            row = self.height - 1 - row
+        if 0 <= col < self.width and 0 <= row < self.height:
+            return row * self.width + col
+        return None
+
+    def _pixels(self, data):
+        if self._odd:
+            data = self._odd + data
+            self._odd = b""
+        if len(data) & 1:
+            self._odd = data[-1:]
+            data = data[:-1]
+
+        values = array("H", data)
+        if sys.byteorder == "little":
+            values.byteswap()
+
+        x0, x1 = self.columns
+        y0, y1 = self.rows
+        i = 0
+        count = len(values)
+        while i < count:
+            run = min(x1 - self._col + 1, count - i)
+            if run <= 0:
+                break
+            self._store(self._col, self._row, values[i : i + run])
+            i += run
+            self._col += run
+            if self._col > x1:
+                self._col = x0
+                self._row += 1
+                if self._row > y1:
+                    self._row = y0
+
+    def _store(self, col, row, values):
+        """Store a run of pixels of one driver row into frame memory."""
+        first = self._index(col, row)
+        if len(values) == 1:
+            if first is not None:
+                self.gram[first] = values[0]
+            return
+
+        last = self._index(col + len(values) - 1, row)
+        if first is None or last is None:
+            # partly off panel, fall back to one pixel at a time
+            for n, value in enumerate(values):
+                index = self._index(col + n, row)
+                if index is not None:
+                    self.gram[index] = value
+            return
+
+        step = (last - first) // (len(values) - 1)
+        stop = first + step * len(values)
+        self.gram[first : stop if stop >= 0 else None : step] = values
+
+    def frame(self):
+        """
+        Close the current frame: store and return its counters, then reset
+        them for the next one.
+        """
+        stats = dict(self.counters)
+        self.frames.append(stats)
+        self.counters = dict.fromkeys(_COUNTERS, 0)
+        return stats
+
+    def visible_row(self, line):
+        """Frame memory row shown on display line `line`, with scrolling."""
+        tfa, vsa, _ = self.scroll
+        if tfa <= line < tfa + vsa:
+            return tfa + (line - tfa + self.vssa - tfa) % vsa
+        return line
+
+    def rgb(self):
+        """Visible area as 8 bit RGB bytes."""
+        width, height = self.visible
+        out = bytearray(width * height * 3)
+        o = 0
+        for line in range(height):
+            base = self.visible_row(line) * self.width
+            for value in self.gram[base : base + width]:
+                r = value >> 11
+                g = (value >> 5) & 0x3F
+                b = value & 0x1F
+                out[o] = (r << 3) | (r >> 2)
+                out[o + 1] = (g << 2) | (g >> 4)
+                out[o + 2] = (b << 3) | (b >> 2)
+                o += 3
+        return out
+
+    def save_png(self, path):
+        """Write the visible area to a PNG file."""
+        width, height = self.visible
+        write_png(path, width, height, self.rgb())
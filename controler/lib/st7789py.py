@@ -36,7 +36,12 @@ This driver supports:
   multiples of 8.  Included are 12 bitmap fonts derived from classic pc
   BIOS text mode fonts.
 - Drawing text using converted TrueType fonts.
+- Drawing text from pre-rendered RGB565 font atlas files, see FontAtlas
 - Drawing converted bitmaps
+- Streaming palette + run length compressed bitmap files, see rle_bitmap
+- Span based line drawing and scanline filled polygons
+- Off-screen RGB565 framebuffer (full screen or tiled) with dirty rectangle
+  flushing, see BufferedST7789
 - Named color constants
 
   - BLACK
@@ -50,7 +55,7 @@ This driver supports:
 
 """
 
-from math import sin, cos
+from math import sin, cos, pi
 
 #
 # This allows sphinx to build the docs
@@ -137,6 +142,31 @@ _ENCODE_POS_16 = const("<HH")
 # must be at least 256 for 16 bit wide fonts
 _BUFFER_SIZE = const(256)
 
+# font atlas file header: magic, version, flags, width, height, first, last,
+# number of color pairs. Followed by the (fg, bg) pairs and the glyphs.
+_ATLAS_MAGIC = b"RGBF"
+_ATLAS_HEADER = ">4sBBHHBBBx"
+_ATLAS_HEADER_SIZE = const(14)
+_ATLAS_SWAPPED = const(0x01)
+
+# compressed bitmap file header: magic, version, width, height, palette size.
+# Followed by the palette and the rows, see ST7789.rle_bitmap.
+_RLE_MAGIC = b"PRLE"
+_RLE_HEADER = ">4sBxHHH"
+_RLE_HEADER_SIZE = const(12)
+_RLE_RUN = const(0x80)
+
+# prebuilt fill_rect buffers kept per color
+_FILL_CACHE_SIZE = const(4)
+
+# rotated polygon vertex cache
+_ROT_CACHE_SIZE = const(8)
+_ANGLE_STEPS = const(360)  # rotations are quantized to 1 degree
+
+# dirty rectangle tracking for BufferedST7789
+_MAX_DIRTY = const(16)
+_MERGE_SLACK = const(256)  # extra pixels worth sending to save a window
+
 _BIT7 = const(0x80)
 _BIT6 = const(0x40)
 _BIT5 = const(0x20)
@@ -299,6 +329,12 @@ class ST7789:
         self._rotation = rotation % 4
         self.color_order = color_order
         self.init_cmds = custom_init or _ST7789_INIT_CMDS
+        self._rot_cache = {}
+        self._fill_cache = []
+        self._cols = None
+        self._rows = None
+        self._txn = 0
+        self.reset_stats()
         self.hard_reset()
         # yes, twice, once is not always enough
         self.init(self.init_cmds)
@@ -324,24 +360,88 @@ class ST7789:
         for command, data, delay in commands:
             self._write(command, data)
             sleep_ms(delay)
+        self._cols = self._rows = None
 
     def _write(self, command=None, data=None):
         """SPI write to the device: commands and data."""
-        if self.cs:
+        if self.cs and not self._txn:
             self.cs.off()
         if command is not None:
             self.dc.off()
             self.spi.write(command)
+            self.commands += 1
         if data is not None:
             self.dc.on()
             self.spi.write(data)
-            if self.cs:
+            self.data_bytes += len(data)
+            if self.cs and not self._txn:
                 self.cs.on()
 
+    def begin(self):
+        """
+        Start a transaction: CS is held low until the matching end(), so a
+        batch of commands and data goes out without toggling CS between
+        writes. Transactions nest. The display can also be used as a
+        context manager:
+
+            with tft:
+                tft.text(font, "Hello", 0, 0)
+        """
+        if not self._txn and self.cs:
+            self.cs.off()
+        self._txn += 1
+
+    def end(self):
+        """
+        End a transaction started with begin().
+        """
+        self._txn -= 1
+        if not self._txn and self.cs:
+            self.cs.on()
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end()
+
+    def reset_stats(self):
+        """
+        Reset the traffic and cache counters.
+        """
+        self.commands = 0
+        self.data_bytes = 0
+        self.saved_commands = 0
+        self.saved_bytes = 0
+        self.saved_alloc = 0
+
+    def stats(self):
+        """
+        Return the traffic and cache counters.
+
+        Returns:
+            dict:
+
+              - commands: command bytes sent
+              - data_bytes: parameter and pixel bytes sent
+              - saved_commands: address commands skipped by the window cache
+              - saved_bytes: bytes skipped by the window cache
+              - saved_alloc: bytes of fill buffers reused instead of allocated
+        """
+        return {
+            "commands": self.commands,
+            "data_bytes": self.data_bytes,
+            "saved_commands": self.saved_commands,
+            "saved_bytes": self.saved_bytes,
+            "saved_alloc": self.saved_alloc,
+        }
+
     def hard_reset(self):
         """
         Hard reset display.
         """
+        self._cols = self._rows = None
         if self.cs:
             self.cs.off()
         if self.reset:
@@ -361,6 +461,7 @@ class ST7789:
         Soft reset display.
         """
         self._write(_ST7789_SWRESET)
+        self._cols = self._rows = None
         sleep_ms(150)
 
     def sleep_mode(self, value):
@@ -419,10 +520,12 @@ class ST7789:
             madctl &= ~_ST7789_MADCTL_BGR
 
         self._write(_ST7789_MADCTL, bytes([madctl]))
+        self._cols = self._rows = None  # xstart and ystart may have changed
 
     def _set_window(self, x0, y0, x1, y1):
         """
-        Set window to column and row address.
+        Set window to column and row address. The column and row addresses
+        are only sent when they differ from the last window.
 
         Args:
             x0 (int): column start address
@@ -431,14 +534,28 @@ class ST7789:
             y1 (int): row end address
         """
         if x0 <= x1 <= self.width and y0 <= y1 <= self.height:
-            self._write(
-                _ST7789_CASET,
-                struct.pack(_ENCODE_POS, x0 + self.xstart, x1 + self.xstart),
-            )
-            self._write(
-                _ST7789_RASET,
-                struct.pack(_ENCODE_POS, y0 + self.ystart, y1 + self.ystart),
-            )
+            cols = self._cols
+            if cols is None or cols[0] != x0 or cols[1] != x1:
+                self._write(
+                    _ST7789_CASET,
+                    struct.pack(_ENCODE_POS, x0 + self.xstart, x1 + self.xstart),
+                )
+                self._cols = (x0, x1)
+            else:
+                self.saved_commands += 1
+                self.saved_bytes += 5
+
+            rows = self._rows
+            if rows is None or rows[0] != y0 or rows[1] != y1:
+                self._write(
+                    _ST7789_RASET,
+                    struct.pack(_ENCODE_POS, y0 + self.ystart, y1 + self.ystart),
+                )
+                self._rows = (y0, y1)
+            else:
+                self.saved_commands += 1
+                self.saved_bytes += 5
+
             self._write(_ST7789_RAMWR)
 
     def vline(self, x, y, length, color):
@@ -523,18 +640,46 @@ class ST7789:
             height (int): Height in pixels
             color (int): 565 encoded color
         """
-        self._set_window(x, y, x + width - 1, y + height - 1)
-        chunks, rest = divmod(width * height, _BUFFER_SIZE)
-        pixel = struct.pack(
-            _ENCODE_PIXEL_SWAPPED if self.needs_swap else _ENCODE_PIXEL, color
-        )
-        self.dc.on()
-        if chunks:
-            data = pixel * _BUFFER_SIZE
+        with self:
+            self._set_window(x, y, x + width - 1, y + height - 1)
+            chunks, rest = divmod(width * height, _BUFFER_SIZE)
+            data = self._fill_buffer(color)
+            self.dc.on()
             for _ in range(chunks):
                 self._write(None, data)
-        if rest:
-            self._write(None, pixel * rest)
+            if rest:
+                self._write(None, data[: rest * 2])
+
+    def _fill_buffer(self, color):
+        """
+        Return a _BUFFER_SIZE pixel buffer filled with color. The buffers of
+        the last few colors are kept so repeated fills do not allocate.
+
+        Args:
+            color (int): 565 encoded color
+
+        Returns:
+            memoryview: _BUFFER_SIZE * 2 bytes of encoded pixels
+        """
+        key = color << 1 | (1 if self.needs_swap else 0)
+        cache = self._fill_cache
+        for i, entry in enumerate(cache):
+            if entry[0] == key:
+                if i != len(cache) - 1:
+                    cache.append(cache.pop(i))  # most recently used last
+                self.saved_alloc += _BUFFER_SIZE * 2
+                return entry[1]
+
+        data = memoryview(
+            struct.pack(
+                _ENCODE_PIXEL_SWAPPED if self.needs_swap else _ENCODE_PIXEL, color
+            )
+            * _BUFFER_SIZE
+        )
+        if len(cache) >= _FILL_CACHE_SIZE:
+            cache.pop(0)
+        cache.append((key, data))
+        return data
 
     def fill(self, color):
         """
@@ -556,6 +701,13 @@ class ST7789:
             y1 (int): End point y coordinate
             color (int): 565 encoded color
         """
+        if y0 == y1:
+            self.hline(min(x0, x1), y0, abs(x1 - x0) + 1, color)
+            return
+        if x0 == x1:
+            self.vline(x0, min(y0, y1), abs(y1 - y0) + 1, color)
+            return
+
         steep = abs(y1 - y0) > abs(x1 - x0)
         if steep:
             x0, y0 = y0, x0
@@ -567,15 +719,19 @@ class ST7789:
         dy = abs(y1 - y0)
         err = dx // 2
         ystep = 1 if y0 < y1 else -1
+        start = x0
         while x0 <= x1:
-            if steep:
-                self.pixel(y0, x0, color)
-            else:
-                self.pixel(x0, y0, color)
             err -= dy
-            if err < 0:
-                y0 += ystep
-                err += dx
+            if err < 0 or x0 == x1:
+                # end of a run of pixels on the same row (or column if steep)
+                if steep:
+                    self.vline(y0, start, x0 - start + 1, color)
+                else:
+                    self.hline(start, y0, x0 - start + 1, color)
+                start = x0 + 1
+                if err < 0:
+                    y0 += ystep
+                    err += dx
             x0 += 1
 
     def vscrdef(self, tfa, vsa, bfa):
@@ -770,10 +926,47 @@ class ST7789:
             else ((background << 8) & 0xFF00) | (background >> 8)
         )
 
-        if font.WIDTH == 8:
-            self._text8(font, text, x0, y0, fg_color, bg_color)
-        else:
-            self._text16(font, text, x0, y0, fg_color, bg_color)
+        with self:
+            if font.WIDTH == 8:
+                self._text8(font, text, x0, y0, fg_color, bg_color)
+            else:
+                self._text16(font, text, x0, y0, fg_color, bg_color)
+
+    def atlas_text(self, atlas, text, x0, y0, color=WHITE, background=BLACK):
+        """
+        Draw text using a pre-rendered font atlas. Each glyph is read from the
+        atlas file into a reusable buffer and sent as is, nothing is expanded
+        at draw time.
+
+        Args:
+            atlas (FontAtlas): font atlas to use
+            text (str): text to write
+            x0 (int): column to start drawing at
+            y0 (int): row to start drawing at
+            color (int): 565 encoded color to use for characters
+            background (int): 565 encoded color to use for background
+
+        Raises:
+            ValueError: if the atlas has no glyphs for the colors or was built
+            for the other byte order
+        """
+        if atlas.swapped != bool(self.needs_swap):
+            raise ValueError("Font atlas byte order does not match the display.")
+
+        pair = atlas.pair(color, background)
+        width = atlas.WIDTH
+        height = atlas.HEIGHT
+
+        with self:
+            for char in text:
+                ch = ord(char)
+                if (
+                    atlas.FIRST <= ch < atlas.LAST
+                    and x0 + width <= self.width
+                    and y0 + height <= self.height
+                ):
+                    self.blit_buffer(atlas.glyph(ch, pair), x0, y0, width, height)
+                x0 += width
 
     def bitmap(self, bitmap, x, y, index=0):
         """
@@ -820,6 +1013,100 @@ class ST7789:
         self._set_window(x, y, to_col, to_row)
         self._write(None, buffer)
 
+    def rle_bitmap(self, file, x, y):
+        """
+        Draw a palette + run length compressed bitmap file, made with
+        tools/rle_bitmap.py, at the specified column and row. The file is
+        decoded one row at a time into a fixed row buffer and streamed
+        through a single window, so memory use does not depend on the
+        bitmap size.
+
+        File layout (big endian):
+
+          - header: b"PRLE", version, pad, width, height, palette size
+          - palette: one 565 color (2 bytes) per entry
+          - rows: 2 byte length of the row data, then packets until the row
+            is complete. A packet byte with bit 7 set is a run of
+            (byte & 0x7f) + 1 pixels of the palette index in the next byte,
+            otherwise byte + 1 palette indexes follow.
+
+        Args:
+            file (str or file): path or open binary file
+            x (int): column to start drawing at
+            y (int): row to start drawing at
+
+        Raises:
+            ValueError: if the file is not a compressed bitmap
+        """
+        close = isinstance(file, str)
+        if close:
+            file = open(file, "rb")
+
+        try:
+            magic, version, width, height, colors = struct.unpack(
+                _RLE_HEADER, file.read(_RLE_HEADER_SIZE)
+            )
+            if magic != _RLE_MAGIC or version != 1:
+                raise ValueError("Not a compressed bitmap file.")
+
+            palette = file.read(colors * 2)
+            first = 1 if self.needs_swap else 0
+            hi = bytearray(colors)  # byte sent first for each palette entry
+            lo = bytearray(colors)
+            for i in range(colors):
+                hi[i] = palette[i * 2 + first]
+                lo[i] = palette[i * 2 + 1 - first]
+
+            to_col = x + width - 1
+            to_row = y + height - 1
+            if self.width <= to_col or self.height <= to_row:
+                return
+
+            row = bytearray(width * 2)
+            pixels = memoryview(row)
+            packets = bytearray(width + width // 128 + 2)  # worst case row
+            size = bytearray(2)
+
+            with self:
+                self._set_window(x, y, to_col, to_row)
+                for _ in range(height):
+                    file.readinto(size)
+                    length = size[0] << 8 | size[1]
+                    file.readinto(memoryview(packets)[:length])
+
+                    i = 0
+                    o = 0
+                    while i < length:
+                        head = packets[i]
+                        i += 1
+                        if head & _RLE_RUN:
+                            count = (head & 0x7F) + 1
+                            index = packets[i]
+                            i += 1
+                            row[o] = hi[index]
+                            row[o + 1] = lo[index]
+                            # fill the run by doubling the copied span
+                            done = 1
+                            while done < count:
+                                step = min(done, count - done)
+                                pixels[o + done * 2 : o + (done + step) * 2] = pixels[
+                                    o : o + step * 2
+                                ]
+                                done += step
+                            o += count * 2
+                        else:
+                            for _ in range(head + 1):
+                                index = packets[i]
+                                i += 1
+                                row[o] = hi[index]
+                                row[o + 1] = lo[index]
+                                o += 2
+
+                    self._write(None, row)
+        finally:
+            if close:
+                file.close()
+
     def pbitmap(self, bitmap, x, y, index=0):
         """
         Draw a bitmap on display at the specified column and row one row at a time
@@ -943,6 +1230,48 @@ class ST7789:
 
         return width
 
+    def _rotate(self, points, angle, center_x, center_y):
+        """
+        Rotate points around the center, caching the result per angle step.
+
+        The cache is keyed on the point values, so a list that is edited in
+        place is rotated again instead of returning stale vertices.
+
+        Args:
+            points (list): List of points to rotate.
+            angle (float): Rotation angle in radians.
+            center_x (int): X-coordinate of the rotation center.
+            center_y (int): Y-coordinate of the rotation center.
+
+        Returns:
+            tuple: rotated points, relative to the polygon's position
+        """
+        step = round(angle * _ANGLE_STEPS / (2 * pi)) % _ANGLE_STEPS
+        shape = tuple(tuple(point) for point in points)
+        key = (shape, step, center_x, center_y)
+        cache = self._rot_cache
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+
+        angle = step * 2 * pi / _ANGLE_STEPS
+        cos_a = cos(angle)
+        sin_a = sin(angle)
+        rotated = tuple(
+            (
+                center_x
+                + int((point[0] - center_x) * cos_a - (point[1] - center_y) * sin_a),
+                center_y
+                + int((point[0] - center_x) * sin_a + (point[1] - center_y) * cos_a),
+            )
+            for point in shape
+        )
+
+        if len(cache) >= _ROT_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+        cache[key] = rotated
+        return rotated
+
     @micropython.native
     def polygon(self, points, x, y, color, angle=0, center_x=0, center_y=0):
         """
@@ -964,31 +1293,475 @@ class ST7789:
             raise ValueError("Polygon must have at least 3 points.")
 
         if angle:
-            cos_a = cos(angle)
-            sin_a = sin(angle)
-            rotated = [
-                (
-                    x
-                    + center_x
-                    + int(
-                        (point[0] - center_x) * cos_a - (point[1] - center_y) * sin_a
-                    ),
-                    y
-                    + center_y
-                    + int(
-                        (point[0] - center_x) * sin_a + (point[1] - center_y) * cos_a
-                    ),
-                )
-                for point in points
-            ]
-        else:
-            rotated = [(x + int((point[0])), y + int((point[1]))) for point in points]
+            points = self._rotate(points, angle, center_x, center_y)
 
-        for i in range(1, len(rotated)):
+        for i in range(1, len(points)):
             self.line(
-                rotated[i - 1][0],
-                rotated[i - 1][1],
-                rotated[i][0],
-                rotated[i][1],
+                x + int(points[i - 1][0]),
+                y + int(points[i - 1][1]),
+                x + int(points[i][0]),
+                y + int(points[i][1]),
                 color,
             )
+
+    @micropython.native
+    def fill_polygon(self, points, x, y, color, angle=0, center_x=0, center_y=0):
+        """
+        Draw a filled polygon on the display, one horizontal span per edge
+        pair on each row (even-odd rule). The polygon is closed implicitly.
+
+        Args:
+            points (list): List of points to draw.
+            x (int): X-coordinate of the polygon's position.
+            y (int): Y-coordinate of the polygon's position.
+            color (int): 565 encoded color.
+            angle (float): Rotation angle in radians (default: 0).
+            center_x (int): X-coordinate of the rotation center (default: 0).
+            center_y (int): Y-coordinate of the rotation center (default: 0).
+
+        Raises:
+            ValueError: If the polygon has less than 3 points.
+        """
+        count = len(points)
+        if count < 3:
+            raise ValueError("Polygon must have at least 3 points.")
+
+        if angle:
+            points = self._rotate(points, angle, center_x, center_y)
+
+        top = max(y + min(int(point[1]) for point in points), 0)
+        bottom = min(y + max(int(point[1]) for point in points), self.height - 1)
+        last_x = self.width - 1
+        nodes = []
+
+        for row in range(top - y, bottom - y + 1):
+            nodes.clear()
+            j = count - 1
+            for i in range(count):
+                xi = int(points[i][0])
+                yi = int(points[i][1])
+                xj = int(points[j][0])
+                yj = int(points[j][1])
+                if yi <= row < yj or yj <= row < yi:
+                    nodes.append(xi + (row - yi) * (xj - xi) // (yj - yi))
+                j = i
+
+            nodes.sort()
+            for i in range(0, len(nodes) - 1, 2):
+                start = max(x + nodes[i], 0)
+                end = min(x + nodes[i + 1], last_x)
+                if start <= end:
+                    self.hline(start, y + row, end - start + 1, color)
+
+
+class FontAtlas:
+    """
+    Pre-rendered RGB565 font stored in a file, made with
+    tools/font_atlas.py. The file stays on flash, only one glyph at a time is
+    read into RAM.
+
+    Args:
+        path (str): atlas file
+
+    Attributes:
+        WIDTH (int): glyph width in pixels
+        HEIGHT (int): glyph height in pixels
+        FIRST (int): first character in the atlas
+        LAST (int): one past the last character in the atlas
+        swapped (bool): pixels are stored little endian
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        (
+            magic,
+            version,
+            flags,
+            self.WIDTH,
+            self.HEIGHT,
+            self.FIRST,
+            self.LAST,
+            pairs,
+        ) = struct.unpack(_ATLAS_HEADER, self._file.read(_ATLAS_HEADER_SIZE))
+        if magic != _ATLAS_MAGIC or version != 1:
+            raise ValueError("Not a font atlas file.")
+
+        self.swapped = bool(flags & _ATLAS_SWAPPED)
+        self._pairs = {}
+        for index in range(pairs):
+            fg, bg = struct.unpack(">HH", self._file.read(4))
+            self._pairs[fg << 16 | bg] = index
+
+        self._glyph_size = self.WIDTH * self.HEIGHT * 2
+        self._pair_size = self._glyph_size * (self.LAST - self.FIRST)
+        self._data = _ATLAS_HEADER_SIZE + pairs * 4
+        self._buffer = bytearray(self._glyph_size)
+
+    def pair(self, color, background):
+        """
+        Return the index of a color pair in the atlas.
+
+        Args:
+            color (int): 565 encoded foreground color
+            background (int): 565 encoded background color
+
+        Raises:
+            ValueError: if the atlas was not built for the colors
+        """
+        try:
+            return self._pairs[color << 16 | background]
+        except KeyError:
+            raise ValueError(
+                f"Font atlas has no glyphs for colors {color:#06x}/{background:#06x}."
+            )
+
+    def glyph(self, ch, pair=0):
+        """
+        Read a glyph into the atlas buffer. The buffer is reused by the next
+        call.
+
+        Args:
+            ch (int): character code
+            pair (int): color pair index, see pair()
+
+        Returns:
+            bytearray: WIDTH * HEIGHT encoded pixels
+        """
+        self._file.seek(
+            self._data + pair * self._pair_size + (ch - self.FIRST) * self._glyph_size
+        )
+        self._file.readinto(self._buffer)
+        return self._buffer
+
+    def close(self):
+        """
+        Close the atlas file.
+        """
+        self._file.close()
+
+
+class BufferedST7789(ST7789):
+    """
+    ST7789 driver that draws into an off-screen RGB565 framebuffer.
+
+    Every primitive writes to RAM instead of the panel and the touched
+    areas are kept as a short list of dirty rectangles. `flush()` merges
+    them and sends each one through a single window.
+
+    In tiled mode only a band of `tile_rows` full width rows is kept in RAM.
+    The screen is then drawn with `render()`, which calls the draw function
+    once per band and clips every primitive to the current band. Outside of
+    `render()` a tiled display draws straight to the panel like ST7789.
+
+    Args:
+        tile_rows (int): 0 for a full screen framebuffer, otherwise the
+            number of rows in each band
+        background (int): 565 encoded color a band is cleared to before it
+            is drawn in tiled mode
+
+        All other arguments are the same as ST7789.
+    """
+
+    def __init__(self, *args, tile_rows=0, background=BLACK, **kwargs):
+        self._fb = None
+        self._drawing = False
+        super().__init__(*args, **kwargs)
+
+        self.tile_rows = tile_rows
+        self.background = background
+        if tile_rows:
+            side = max(self.physical_width, self.physical_height)
+            self._fb = bytearray(side * tile_rows * 2)
+        else:
+            self._fb = bytearray(self.physical_width * self.physical_height * 2)
+        self._mv = memoryview(self._fb)
+        self._dirty = []
+        self._win = None
+        self._ptr = 0
+        self._pass = 0
+        self._band_y = 0
+        self._band_rows = self.height
+        self._drawing = not tile_rows
+
+    def rotation(self, rotation):
+        """
+        Set display rotation, see ST7789.rotation. Pending dirty areas are
+        dropped since their coordinates no longer apply.
+        """
+        super().rotation(rotation)
+        if self._fb is not None:
+            self._dirty.clear()
+            self._win = None
+            if not self.tile_rows:
+                self._band_rows = self.height
+
+    def _mark(self, x0, y0, x1, y1):
+        """
+        Add a rectangle to the dirty list, merging it with the rectangles
+        it overlaps or nearly touches.
+        """
+        if self._pass:
+            return  # tiled mode: the first pass already found every dirty area
+
+        x0 = max(x0, 0)
+        y0 = max(y0, 0)
+        x1 = min(x1, self.width - 1)
+        y1 = min(y1, self.height - 1)
+        if x0 > x1 or y0 > y1:
+            return
+
+        dirty = self._dirty
+        i = 0
+        while i < len(dirty):
+            r = dirty[i]
+            mx0 = min(r[0], x0)
+            my0 = min(r[1], y0)
+            mx1 = max(r[2], x1)
+            my1 = max(r[3], y1)
+            merged = (mx1 - mx0 + 1) * (my1 - my0 + 1)
+            if merged <= (
+                (r[2] - r[0] + 1) * (r[3] - r[1] + 1)
+                + (x1 - x0 + 1) * (y1 - y0 + 1)
+                + _MERGE_SLACK
+            ):
+                del dirty[i]
+                x0, y0, x1, y1 = mx0, my0, mx1, my1
+                i = 0
+                continue
+            i += 1
+
+        if len(dirty) >= _MAX_DIRTY:
+            # fold into the rectangle that grows the least
+            best = 0
+            growth = None
+            for i, r in enumerate(dirty):
+                g = (max(r[2], x1) - min(r[0], x0) + 1) * (
+                    max(r[3], y1) - min(r[1], y0) + 1
+                ) - (r[2] - r[0] + 1) * (r[3] - r[1] + 1)
+                if growth is None or g < growth:
+                    best = i
+                    growth = g
+            r = dirty.pop(best)
+            x0 = min(r[0], x0)
+            y0 = min(r[1], y0)
+            x1 = max(r[2], x1)
+            y1 = max(r[3], y1)
+
+        dirty.append([x0, y0, x1, y1])
+
+    def _set_window(self, x0, y0, x1, y1):
+        """
+        Set window to column and row address, see ST7789._set_window. While
+        drawing to the framebuffer the window is only recorded and marked
+        dirty.
+        """
+        if not self._drawing:
+            super()._set_window(x0, y0, x1, y1)
+            return
+
+        if x0 <= x1 <= self.width and y0 <= y1 <= self.height:
+            self._win = (x0, y0, x1, y1)
+            self._ptr = 0
+            self._mark(x0, y0, x1, y1)
+        else:
+            self._win = None
+
+    def _write(self, command=None, data=None):
+        """
+        SPI write to the device, see ST7789._write. While drawing to the
+        framebuffer pixel data is copied into the current window in RAM.
+        """
+        if self._drawing and command is None:
+            if data is not None:
+                self._stream(data)
+            return
+        super()._write(command, data)
+
+    def _stream(self, data):
+        """Copy pixel data into the recorded window, clipped to the band."""
+        win = self._win
+        if win is None:
+            return
+
+        x0, y0, x1, y1 = win
+        ww = x1 - x0 + 1
+        width = self.width
+        band_y = self._band_y
+        band_end = band_y + self._band_rows
+        fb = self._mv
+        src = memoryview(data)
+        size = len(data) & ~1
+        ptr = self._ptr
+        i = 0
+        while i < size:
+            row, col = divmod(ptr, ww)
+            y = y0 + row
+            if y > y1:
+                break
+            count = min(ww - col, (size - i) >> 1)
+            if band_y <= y < band_end:
+                x = x0 + col
+                visible = min(count, width - x)
+                if visible > 0:
+                    dst = ((y - band_y) * width + x) * 2
+                    fb[dst : dst + visible * 2] = src[i : i + visible * 2]
+            ptr += count
+            i += count * 2
+        self._ptr = ptr
+
+    def pixel(self, x, y, color):
+        """
+        Draw a pixel at the given location and color.
+
+        Args:
+            x (int): x coordinate
+            Y (int): y coordinate
+            color (int): 565 encoded color
+        """
+        if not self._drawing:
+            super().pixel(x, y, color)
+            return
+
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self._mark(x, y, x, y)
+            if self._band_y <= y < self._band_y + self._band_rows:
+                dst = ((y - self._band_y) * self.width + x) * 2
+                if self.needs_swap:
+                    self._fb[dst] = color & 0xFF
+                    self._fb[dst + 1] = color >> 8
+                else:
+                    self._fb[dst] = color >> 8
+                    self._fb[dst + 1] = color & 0xFF
+
+    def fill_rect(self, x, y, width, height, color):
+        """
+        Draw a rectangle at the given location, size and filled with color.
+
+        Args:
+            x (int): Top left corner x coordinate
+            y (int): Top left corner y coordinate
+            width (int): Width in pixels
+            height (int): Height in pixels
+            color (int): 565 encoded color
+        """
+        if not self._drawing:
+            super().fill_rect(x, y, width, height, color)
+            return
+
+        self._mark(x, y, x + width - 1, y + height - 1)
+        x0 = max(x, 0)
+        x1 = min(x + width, self.width)
+        y0 = max(y, self._band_y)
+        y1 = min(y + height, self._band_y + self._band_rows, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        size = (x1 - x0) * 2
+        if size <= _BUFFER_SIZE * 2:
+            row = self._fill_buffer(color)[:size]
+        else:
+            row = struct.pack(
+                _ENCODE_PIXEL_SWAPPED if self.needs_swap else _ENCODE_PIXEL, color
+            ) * (x1 - x0)
+        fb = self._mv
+        stride = self.width * 2
+        dst = (y0 - self._band_y) * stride + x0 * 2
+        for _ in range(y1 - y0):
+            fb[dst : dst + size] = row
+            dst += stride
+
+    def _send(self, x0, y0, x1, y1):
+        """Send one dirty rectangle, clipped to the band, to the display."""
+        band_y = self._band_y
+        y0 = max(y0, band_y)
+        y1 = min(y1, band_y + self._band_rows - 1)
+        if y0 > y1:
+            return
+
+        ST7789._set_window(self, x0, y0, x1, y1)
+        fb = self._mv
+        stride = self.width * 2
+        start = (y0 - band_y) * stride
+        if x0 == 0 and x1 == self.width - 1:
+            ST7789._write(self, None, fb[start : start + (y1 - y0 + 1) * stride])
+            return
+
+        start += x0 * 2
+        size = (x1 - x0 + 1) * 2
+        for _ in range(y1 - y0 + 1):
+            ST7789._write(self, None, fb[start : start + size])
+            start += stride
+
+    def flush(self):
+        """
+        Send the dirty areas of the framebuffer to the display and clear the
+        dirty list. Does nothing for a tiled display, use render() instead.
+        """
+        if self.tile_rows:
+            return
+
+        with self:
+            for rect in self._dirty:
+                self._send(*rect)
+        self._dirty.clear()
+
+    def render(self, draw):
+        """
+        Draw a whole frame and send it to the display.
+
+        With a full screen framebuffer `draw(tft)` is called once and the
+        result flushed. In tiled mode `draw(tft)` is called once per band, so
+        it must draw the same frame every time, and every dirty area is
+        cleared to `background` before it is drawn.
+
+        Args:
+            draw (function): called with the display as its only argument
+        """
+        if not self.tile_rows:
+            draw(self)
+            self.flush()
+            return
+
+        width = self.width
+        height = self.height
+        rows = self.tile_rows
+        clear = struct.pack(
+            _ENCODE_PIXEL_SWAPPED if self.needs_swap else _ENCODE_PIXEL,
+            self.background,
+        ) * width
+        fb = self._mv
+        stride = width * 2
+
+        self._dirty.clear()
+        self._drawing = True
+        try:
+            band = 0
+            while band < height:
+                self._band_y = band
+                self._band_rows = min(rows, height - band)
+                band += rows
+
+                if self._pass:
+                    # dirty areas are known after the first pass, skip clean bands
+                    band_end = self._band_y + self._band_rows - 1
+                    for rect in self._dirty:
+                        if rect[1] <= band_end and rect[3] >= self._band_y:
+                            break
+                    else:
+                        continue
+
+                for i in range(self._band_rows):
+                    fb[i * stride : (i + 1) * stride] = clear
+                self._win = None
+                draw(self)
+                with self:
+                    for rect in self._dirty:
+                        self._send(*rect)
+                self._pass += 1
+        finally:
+            self._drawing = False
+            self._pass = 0
+            self._band_y = 0
+            self._band_rows = rows
+            self._win = None
+            self._dirty.clear()
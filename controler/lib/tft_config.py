@@ -15,28 +15,29 @@ SCROLL = 0  # orientation for scroll.py
 FEATHERS = 1  # orientation for feathers.py
 
 
-def config(rotation=0):
+def config(rotation=0, buffered=False, tile_rows=0):
     """
     Configures and returns an instance of the ST7789 display driver.
 
     Args:
         rotation (int): The rotation of the display. Defaults to 0.
+        buffered (bool): Draw into an off-screen framebuffer and send it with
+            flush() or render(). Defaults to False.
+        tile_rows (int): Rows per band for a tiled framebuffer, 0 keeps the
+            whole screen in RAM. Only used when buffered. Defaults to 0.
 
     Returns:
         ST7789: An instance of the ST7789 display driver.
     """
-
-    return st7789.ST7789(
-        SPI(
-            2,
-            baudrate=40_000_000,
-            polarity=0,
-            sck=Pin(40, Pin.OUT),
-            mosi=Pin(41, Pin.OUT),
-            miso=None,
-        ),
-        240,
-        240,
+    spi = SPI(
+        2,
+        baudrate=40_000_000,
+        polarity=0,
+        sck=Pin(40, Pin.OUT),
+        mosi=Pin(41, Pin.OUT),
+        miso=None,
+    )
+    pins = dict(
         reset=Pin(42, Pin.OUT),
         cs=Pin(39, Pin.OUT),
         dc=Pin(38, Pin.OUT),
@@ -44,4 +45,7 @@ def config(rotation=0):
         rotation=rotation,
     )
 
+    if buffered:
+        return st7789.BufferedST7789(spi, 240, 240, tile_rows=tile_rows, **pins)
 
+    return st7789.ST7789(spi, 240, 240, **pins)
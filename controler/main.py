@@ -9,6 +9,8 @@ from machine import Pin, ADC
 # 本地库
 import modules.gamepad as gamepad
 import modules.lcd as lcd
+from modules.display import DisplayService
+from modules.menu import Menu, Param
 from modules.utils import TimeDiff
 
 
@@ -30,8 +32,35 @@ now.add_peer(peer)
 gamepad = gamepad.Gamepad()
 main_dt = TimeDiff()
 
-gamepad_data = []
-diff = 1_000_000  #随便初始化一个数
+# 小车参数菜单, 参数名与小车端 modules/params.py 一致
+menu = Menu([
+    Param("scale_x", 0.8, 0.0, 1.0, 0.05),
+    Param("scale_y", 0.8, 0.0, 1.0, 0.05),
+    Param("scale_w", 0.4, 0.0, 1.0, 0.05),
+    Param("dead_area", 20, 0, 60, 1),
+    Param("kp", 0.3, 0.0, 5.0, 0.01),
+    Param("ki", 0.0, 0.0, 5.0, 0.01),
+    Param("kd", 0.02, 0.0, 1.0, 0.005),
+    Param("accel", 400, 50, 2000, 50),
+    Param("jerk", 4000, 0, 20000, 500),
+])
+
+
+def render(frame, diff_ns, frame_us):
+    """ 显示线程: 处理菜单按键, 显示菜单或手柄数据 """
+    if menu.update(frame) and not menu.active:
+        lcd.tft.fill(0)  # 关闭菜单后清掉菜单文字
+
+    if menu.active:
+        menu.draw(lcd.tft, lcd.font)
+    else:
+        lcd.show_gamepad(frame, diff_ns, frame_us)
+
+
+# 显示服务, 发送线程只发布数据快照, 绘制在显示线程里完成
+display = DisplayService(render, size=len(gamepad.data), fps=10)
+
+diff_ns_max = 0  # 发送周期最大值, 用于观察屏幕刷新对发送的影响
 
 
 def data_to_json(data):
@@ -50,20 +79,8 @@ def data_to_json(data):
     
     return json.dumps(data_dict)
 
-def show_lcd():
-    global gamepad_data, diff_ns
-    
-    time.sleep(1)  # 延时1秒, 不然不显示
-
-    while True:
-
-        lcd.show_gamepad(gamepad_data, diff_ns)  #lcd显示数据
-
-        time.sleep(0.1) 
-
-
 def send_espnow():
-    global gamepad_data, peer, diff_ns
+    global peer, diff_ns_max
 
     while True:
         gamepad_data = gamepad.read()
@@ -75,10 +92,16 @@ def send_espnow():
         now.send(peer, data_json) 
         print(f"发送数据: {gamepad_data}") 
 
+        param_json = menu.pop()  # 参数修改夹在两帧手柄数据之间发送, 每帧最多一条
+        if param_json:
+            now.send(peer, param_json)
+            print(f"发送参数: {param_json}")
+
         diff_ns = main_dt.time_diff() 
-        print(f"延迟ms: {diff_ns / 1000_000}, 频率Hz: {1_000_000_000 / diff_ns}")
+        diff_ns_max = max(diff_ns_max, diff_ns)
+        print(f"延迟ms: {diff_ns / 1000_000}, 频率Hz: {1_000_000_000 / diff_ns}, 最大延迟ms: {diff_ns_max / 1000_000}, 绘制ms: {display.frame_us / 1000}")
         
-        #lcd.show_gamepad(gamepad_data, diff_ns)  #lcd显示数据
+        display.publish(gamepad_data, diff_ns)  # 只拷贝快照, 不阻塞发送
         
         time.sleep(0.001)
         
@@ -87,7 +110,9 @@ def send_espnow():
 
 def main():
     _thread.start_new_thread(send_espnow, ())
-    _thread.start_new_thread(show_lcd, ())
+
+    time.sleep(1)  # 延时1秒, 不然不显示
+    display.start()
 
     while True:
         time.sleep(1)  # 主线程保持运行
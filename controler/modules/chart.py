@@ -0,0 +1,121 @@
+import struct
+
+import lib.tft_config as tft_config
+
+
+GRAM_LINES = 320  # ST7789 显存共 320 行, 硬件滚动以显存行为单位
+
+
+class StripChart:
+    def __init__(self, tft, channels, tfa=tft_config.TFA, bfa=tft_config.BFA,
+                 background=0x0000, reverse=False):
+        """
+        基于硬件垂直滚动的滚动曲线图, 每个采样只画一行(竖屏)或一列(横屏),
+        然后移动屏幕的滚动起始地址, 不重绘整个图表
+        @param tft: ST7789 屏幕对象
+        @param channels: 每个通道的 (最小值, 最大值, 颜色565)
+        @param tfa: 顶部固定区行数
+        @param bfa: 底部固定区行数
+        @param background: 背景色
+        @param reverse: 屏幕滚动方向与画线方向相反时设为 True
+        """
+        self.tft = tft
+        self.channels = channels
+        self.tfa = tfa
+        self.vsa = GRAM_LINES - tfa - bfa
+        self.reverse = reverse
+
+        # 显存行列未交换(MADCTL 的 MV 位为 0)时每个采样画一行, 否则画一列
+        self.vertical = not tft.rotations[tft._rotation][0] & 0x20
+        self.extent = tft.width if self.vertical else tft.height
+
+        fmt = ">H" if not tft.needs_swap else "<H"
+        self._clear = struct.pack(fmt, background) * self.extent
+        self._colors = [memoryview(struct.pack(fmt, color) * self.extent)
+                        for _, _, color in channels]
+        self._scale = [(self.extent - 1) / (high - low) for low, high, _ in channels]
+        self._prev = [-1] * len(channels)
+        self._line = bytearray(self.extent * 2)
+        self._head = 0
+
+        tft.vscrdef(tfa, self.vsa, bfa)
+        self.reset()
+
+    def reset(self):
+        """ 清空图表并回到初始滚动位置 """
+        self._head = 0
+        for i in range(len(self._prev)):
+            self._prev[i] = -1
+
+        self._line[:] = self._clear
+        for _ in range(self.vsa):
+            self._blit()
+            self._head += 1
+        self._head = 0
+        self.tft.vscsad(self.tfa)
+
+    def _blit(self):
+        """ 把行缓冲写到当前显存行 """
+        offset = self._head if not self.reverse else self.vsa - 1 - self._head
+        line = self.tfa + offset
+
+        if self.vertical:
+            self.tft.blit_buffer(self._line, 0, line - self.tft.ystart, self.extent, 1)
+        else:
+            self.tft.blit_buffer(self._line, line - self.tft.xstart, 0, 1, self.extent)
+
+        flush = getattr(self.tft, "flush", None)  # 带帧缓冲的屏幕需要立即送出
+        if flush:
+            flush()
+
+    def push(self, *values):
+        """
+        追加一个采样, 每个通道一个值
+        相邻两个采样之间画成连续的线段, 避免快速变化时出现断点
+        """
+        line = self._line
+        line[:] = self._clear
+
+        last = self.extent - 1
+        for i, value in enumerate(values):
+            low = self.channels[i][0]
+            pos = int((value - low) * self._scale[i])
+            pos = min(max(pos, 0), last)
+            if not self.vertical:
+                pos = last - pos  # 横屏时数值大的在上方
+
+            prev = self._prev[i]
+            if prev < 0:
+                prev = pos
+            start = min(prev, pos) * 2
+            end = max(prev, pos) * 2 + 2
+            line[start:end] = self._colors[i][start:end]
+            self._prev[i] = pos
+
+        self._blit()
+        self._head = (self._head + 1) % self.vsa
+
+        # 最新的一行滚动到滚动区的末尾
+        start = self._head if not self.reverse else (self.vsa - self._head) % self.vsa
+        self.tft.vscsad(self.tfa + start)
+
+    def close(self):
+        """ 恢复为不滚动的整屏显示 """
+        self.tft.vscrdef(0, GRAM_LINES, 0)
+        self.tft.vscsad(0)
+
+
+if __name__ == "__main__":
+    import time
+    import math
+
+    import lib.st7789py as st7789
+
+    tft = tft_config.config(tft_config.WIDE)
+    chart = StripChart(tft, [(-1, 1, st7789.GREEN), (-1, 1, st7789.RED)])
+
+    t = 0
+    while True:
+        chart.push(math.sin(t), math.cos(t * 0.7))
+        t += 0.1
+        time.sleep(0.01)
@@ -0,0 +1,70 @@
+import time
+import _thread
+
+
+class DisplayService:
+    def __init__(self, render, size=8, fps=10):
+        """
+        显示服务: 在独立线程里按固定帧率刷新屏幕, 和发送线程解耦
+        @param render: 绘制函数, render(frame, diff_ns, frame_us)
+        @param size: 快照数据长度, 默认与手柄数据长度一致
+        @param fps: 最大帧率
+        """
+        self.render = render
+        self.period_ms = 1000 // fps
+
+        # 双缓冲: 发送线程只写后台缓冲, 显示线程只读前台缓冲
+        self._frames = [[0] * size, [0] * size]
+        self._diffs = [1_000_000, 1_000_000]
+        self._back = 0
+        self._fresh = False
+        self._lock = _thread.allocate_lock()
+
+        self.frame_us = 0      # 上一帧绘制耗时
+        self.frame_us_max = 0  # 最大绘制耗时
+        self.frames = 0        # 已绘制帧数
+        self.running = False
+
+    def publish(self, data, diff_ns):
+        """ 发送线程调用: 把最新数据拷进后台缓冲, 不做任何绘制 """
+        with self._lock:
+            frame = self._frames[self._back]
+            for i in range(len(frame)):
+                frame[i] = data[i]
+            self._diffs[self._back] = diff_ns
+            self._fresh = True
+
+    def _swap(self):
+        """ 交换前后台缓冲, 返回新的前台索引, 没有新数据时返回 None """
+        with self._lock:
+            if not self._fresh:
+                return None
+            front = self._back
+            self._back ^= 1
+            self._fresh = False
+            return front
+
+    def run(self):
+        """ 显示线程主循环 """
+        self.running = True
+        while self.running:
+            start = time.ticks_ms()
+
+            front = self._swap()
+            if front is not None:
+                t0 = time.ticks_us()
+                self.render(self._frames[front], self._diffs[front], self.frame_us)
+                self.frame_us = time.ticks_diff(time.ticks_us(), t0)
+                self.frame_us_max = max(self.frame_us_max, self.frame_us)
+                self.frames += 1
+
+            # 限制帧率, 剩余时间让给发送线程
+            wait = self.period_ms - time.ticks_diff(time.ticks_ms(), start)
+            time.sleep_ms(wait if wait > 1 else 1)
+
+    def start(self):
+        """ 启动显示线程 """
+        _thread.start_new_thread(self.run, ())
+
+    def stop(self):
+        self.running = False
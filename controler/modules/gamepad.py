@@ -4,6 +4,9 @@ from machine import Pin, ADC
 
 from modules.utils import debounce, map_value
 
+MODE_ROBOT = 6  # 车身坐标系: 前推摇杆 = 车头方向
+MODE_FIELD = 7  # 场地坐标系: 前推摇杆 = 航向零点方向, 与车头朝向无关
+
 
 class Button:
     def __init__(self, pin, callback):
@@ -57,7 +60,7 @@ class Gamepad:
         self.init_inputs()
 
         # id, lx, ly, rx, ry, abxy & dpad, ls & rs & start & back, mode
-        self.data = [1, 0,0, 0,0, 8,0, 6]  # 默认数据举例
+        self.data = [1, 0,0, 0,0, 8,0, MODE_ROBOT]  # 默认数据举例
 
     def set_bit(self, num, bit_position, value):
         """
@@ -167,6 +170,8 @@ class Gamepad:
     @debounce(key_timeout)
     def start_callback(self, KEY):
         self.data[6] = self.set_bit(self.data[6], 5, KEY.value())
+        if KEY.value() == 0:  # 按下时切换车身/场地坐标系
+            self.data[7] = MODE_FIELD if self.data[7] == MODE_ROBOT else MODE_ROBOT
 
     @debounce(key_timeout)
     def select_callback(self, KEY):
@@ -10,7 +10,7 @@ tft.rotation(0)
 tft.text(font, "Hello GamePad!", 80, 120)
 tft.text(font, "...           ", 80, 120)  # 清屏但保留一个点, 不然后面数据刷不出来
 
-def show_gamepad(data, diff_ns):
+def show_gamepad(data, diff_ns, frame_us=0):
 
     tft.text(
         font,
@@ -43,6 +43,11 @@ def show_gamepad(data, diff_ns):
     #     f"crc8: {bin(checksum)}     ",
     #     10, 180
     # )
+    tft.text(
+        font,
+        f"LCD: {(frame_us / 1000):.1f} ms     ",  # 上一帧绘制耗时
+        10, 180
+    )
     tft.text(
         font,
         f"Speed: {(1_000_000_000 / diff_ns):.2f} Hz ,{(diff_ns / 1000_000):.2f} ms ",
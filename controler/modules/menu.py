@@ -0,0 +1,142 @@
+import json
+import _thread
+
+
+# 方向键编码, 见 Gamepad.DIRECTION_MAP
+DPAD_UP = 0
+DPAD_RIGHT = 2
+DPAD_DOWN = 4
+DPAD_LEFT = 6
+
+BIT_A = 1 << 6     # data[5]
+BIT_B = 1 << 5     # data[5]
+BIT_BACK = 1 << 4  # data[6]
+
+ROW_HEIGHT = 24
+ROW_TOP = 10
+
+
+class Param:
+    def __init__(self, name, value, low, high, step):
+        """
+        可调参数
+        @param name: 参数名, 与小车端参数表一致
+        @param value: 默认值, int 或 float 决定参数类型
+        @param low: 最小值
+        @param high: 最大值
+        @param step: 每次按键的调整量
+        """
+        self.name = name
+        self.type = type(value)
+        self.value = value
+        self.sent = value  # 上次发给小车的值
+        self.low = low
+        self.high = high
+        self.step = step
+
+    def adjust(self, steps):
+        """ 按步长调整, 并限制在范围内 """
+        value = min(max(self.value + steps * self.step, self.low), self.high)
+        if self.type is float:
+            value = round(value, 4)  # 避免浮点累加误差
+        self.value = self.type(value)
+
+    def text(self):
+        value = f"{self.value:.3f}" if self.type is float else str(self.value)
+        mark = "*" if self.value != self.sent else " "
+        return f"{self.name}: {value}{mark}"
+
+
+class Menu:
+    def __init__(self, params, repeat=3):
+        """
+        参数菜单: Back 键打开/关闭, 上下选择, 左右调整, A 发送到小车, B 撤销修改
+        @param params: Param 列表
+        @param repeat: 每次发送重复的次数, 广播没有应答, 重复发送防止丢包
+        """
+        self.params = params
+        self.repeat = repeat
+        self.active = False
+        self.focus = 0
+
+        self._last_dpad = 8
+        self._last_buttons = 0
+        self._dirty = set()  # 需要重绘的行
+        self._clear = False  # 打开菜单时需要清屏
+
+        self._queue = []  # 待发送的 (消息, 剩余次数)
+        self._lock = _thread.allocate_lock()
+
+    def update(self, data):
+        """
+        根据手柄数据处理按键, 只响应按下的瞬间
+        @return: 菜单打开或关闭时返回 True
+        """
+        dpad = data[5] & 0x0F
+        buttons = (data[5] & 0xF0) | (data[6] & BIT_BACK)
+        pressed = buttons & ~self._last_buttons
+        dpad_pressed = dpad if dpad != self._last_dpad else 8
+        self._last_dpad = dpad
+        self._last_buttons = buttons
+
+        if pressed & BIT_BACK:
+            self.active = not self.active
+            if self.active:
+                self._clear = True
+                self._dirty = set(range(len(self.params)))
+            return True
+
+        if not self.active:
+            return False
+
+        param = self.params[self.focus]
+        if dpad_pressed == DPAD_UP or dpad_pressed == DPAD_DOWN:
+            self._dirty.add(self.focus)
+            step = -1 if dpad_pressed == DPAD_UP else 1
+            self.focus = (self.focus + step) % len(self.params)
+            self._dirty.add(self.focus)
+
+        elif dpad_pressed == DPAD_LEFT or dpad_pressed == DPAD_RIGHT:
+            param.adjust(-1 if dpad_pressed == DPAD_LEFT else 1)
+            self._dirty.add(self.focus)
+
+        elif pressed & BIT_A:
+            self.send(param)
+            self._dirty.add(self.focus)
+
+        elif pressed & BIT_B:
+            param.value = param.sent
+            self._dirty.add(self.focus)
+
+        return False
+
+    def send(self, param):
+        """ 把参数放进发送队列, 由发送线程在两帧手柄数据之间发出 """
+        param.sent = param.value
+        msg = json.dumps({"P": param.name, "V": param.value})
+        with self._lock:
+            # 同一个参数只保留最新的值
+            self._queue = [item for item in self._queue if item[2] != param.name]
+            self._queue.append([msg, self.repeat, param.name])
+
+    def pop(self):
+        """ 发送线程调用: 取出一条待发送的消息, 没有时返回 None """
+        if not self._queue:
+            return None
+        with self._lock:
+            item = self._queue[0]
+            item[1] -= 1
+            if item[1] <= 0:
+                self._queue.pop(0)
+            return item[0]
+
+    def draw(self, tft, font):
+        """ 只重绘内容有变化的行 """
+        if self._clear:
+            tft.fill(0)
+            self._clear = False
+
+        while self._dirty:
+            i = self._dirty.pop()
+            cursor = ">" if i == self.focus else " "
+            tft.text(font, f"{cursor}{self.params[i].text():<28}", 0, ROW_TOP + i * ROW_HEIGHT)
@@ -0,0 +1,136 @@
+"""
+Pre-render a bitmap font into an RGB565 font atlas file for
+st7789py.FontAtlas / ST7789.atlas_text().
+
+Runs on the host. The font is one of the 8 or 16 pixel wide bitmap font
+modules used by ST7789.text(), e.g. lib/vga1_8x16.py. Every glyph is
+rendered once per color pair, optionally scaled up, and stored in the byte
+order the panel expects, so drawing is a plain file read.
+
+Usage:
+
+    python tools/font_atlas.py lib/vga1_8x16.py vga_16x32.atl \\
+        --pair WHITE,BLACK --pair YELLOW,BLACK --scale 2
+
+Colors are names of the st7789py color constants or 565 values such as
+0xF800. Copy the atlas to the board and load it with
+st7789py.FontAtlas("vga_16x32.atl").
+"""
+
+import argparse
+import importlib.util
+import struct
+
+# keep in step with st7789py
+ATLAS_MAGIC = b"RGBF"
+ATLAS_HEADER = ">4sBBHHBBBx"
+ATLAS_SWAPPED = 0x01
+
+COLORS = {
+    "BLACK": 0x0000,
+    "BLUE": 0x001F,
+    "RED": 0xF800,
+    "GREEN": 0x07E0,
+    "CYAN": 0x07FF,
+    "MAGENTA": 0xF81F,
+    "YELLOW": 0xFFE0,
+    "WHITE": 0xFFFF,
+}
+
+
+def load_font(path):
+    """Import a font module from a file."""
+    spec = importlib.util.spec_from_file_location("font", path)
+    font = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(font)
+    return font
+
+
+def parse_color(text):
+    text = text.strip()
+    if text.upper() in COLORS:
+        return COLORS[text.upper()]
+    return int(text, 0) & 0xFFFF
+
+
+def parse_pair(text):
+    fg, bg = text.split(",")
+    return parse_color(fg), parse_color(bg)
+
+
+def glyph_bits(font, ch):
+    """Rows of a glyph as lists of 0/1, in the layout ST7789.text() reads."""
+    row_bytes = font.WIDTH // 8
+    size = row_bytes * font.HEIGHT
+    data = bytes(font.FONT[(ch - font.FIRST) * size : (ch - font.FIRST + 1) * size])
+    rows = []
+    for row in range(font.HEIGHT):
+        bits = []
+        for byte in data[row * row_bytes : (row + 1) * row_bytes]:
+            bits.extend((byte >> (7 - bit)) & 1 for bit in range(8))
+        rows.append(bits)
+    return rows
+
+
+def render(font, pairs, scale=1, swap=False):
+    """Return the atlas file contents."""
+    width = font.WIDTH * scale
+    height = font.HEIGHT * scale
+    encode = "<H" if swap else ">H"
+
+    out = bytearray(
+        struct.pack(
+            ATLAS_HEADER,
+            ATLAS_MAGIC,
+            1,
+            ATLAS_SWAPPED if swap else 0,
+            width,
+            height,
+            font.FIRST,
+            font.LAST,
+            len(pairs),
+        )
+    )
+    for fg, bg in pairs:
+        out += struct.pack(">HH", fg, bg)
+
+    for fg, bg in pairs:
+        pixels = (struct.pack(encode, bg), struct.pack(encode, fg))
+        for ch in range(font.FIRST, font.LAST):
+            for bits in glyph_bits(font, ch):
+                row = b"".join(pixels[bit] * scale for bit in bits)
+                out += row * scale
+
+    return bytes(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("font", help="bitmap font module, e.g. lib/vga1_8x16.py")
+    parser.add_argument("output", help="atlas file to write")
+    parser.add_argument(
+        "--pair",
+        action="append",
+        type=parse_pair,
+        help="foreground,background colors, can be repeated (default WHITE,BLACK)",
+    )
+    parser.add_argument("--scale", type=int, default=1, help="integer scale factor")
+    parser.add_argument(
+        "--swap", action="store_true", help="little endian pixels, for needs_swap displays"
+    )
+    args = parser.parse_args()
+
+    font = load_font(args.font)
+    pairs = args.pair or [(COLORS["WHITE"], COLORS["BLACK"])]
+    data = render(font, pairs, args.scale, args.swap)
+    with open(args.output, "wb") as f:
+        f.write(data)
+
+    print(
+        f"{args.output}: {font.WIDTH * args.scale}x{font.HEIGHT * args.scale},"
+        f" {font.LAST - font.FIRST} glyphs x {len(pairs)} color pairs, {len(data)} bytes"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Convert a bitmap into the palette + run length compressed format drawn by
+ST7789.rle_bitmap().
+
+Runs on the host. The input is either a converted bitmap module as used by
+ST7789.bitmap() (WIDTH, HEIGHT, BPP, PALETTE, BITMAP) or, when Pillow is
+installed, any image file, which is reduced to at most 256 colors.
+
+Usage:
+
+    python tools/rle_bitmap.py logo.py logo.rle [--index N]
+    python tools/rle_bitmap.py splash.png splash.rle [--colors 16]
+"""
+
+import argparse
+import importlib.util
+import struct
+
+# keep in step with st7789py
+RLE_MAGIC = b"PRLE"
+RLE_HEADER = ">4sBxHHH"
+MAX_RUN = 128
+
+
+def color565(red, green, blue):
+    return (red & 0xF8) << 8 | (green & 0xFC) << 3 | blue >> 3
+
+
+def load_module(path, index=0):
+    """Palette and pixel indexes from a converted bitmap module."""
+    spec = importlib.util.spec_from_file_location("bitmap", path)
+    bitmap = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bitmap)
+
+    width = bitmap.WIDTH
+    height = bitmap.HEIGHT
+    bpp = bitmap.BPP
+    bs_bit = bpp * width * height * index
+    pixels = []
+    for _ in range(width * height):
+        color_index = 0
+        for _ in range(bpp):
+            color_index = (color_index << 1) | (
+                (bitmap.BITMAP[bs_bit >> 3] >> (7 - (bs_bit & 7))) & 1
+            )
+            bs_bit += 1
+        pixels.append(color_index)
+
+    return width, height, list(bitmap.PALETTE), pixels
+
+
+def load_image(path, colors=256):
+    """Palette and pixel indexes from an image file, needs Pillow."""
+    try:
+        from PIL import Image
+    except ImportError:
+        raise SystemExit("Pillow is needed to convert image files: pip install pillow")
+
+    image = Image.open(path).convert("RGB").quantize(colors)
+    width, height = image.size
+    rgb = image.getpalette()[: len(image.getcolors()) * 3]
+    palette = [color565(*rgb[i : i + 3]) for i in range(0, len(rgb), 3)]
+    return width, height, palette, list(image.getdata())
+
+
+def encode_row(row):
+    """Encode one row of palette indexes into packets."""
+    out = bytearray()
+    literal = []
+
+    def flush():
+        while literal:
+            chunk = literal[:MAX_RUN]
+            del literal[:MAX_RUN]
+            out.append(len(chunk) - 1)
+            out.extend(chunk)
+
+    i = 0
+    while i < len(row):
+        run = 1
+        while i + run < len(row) and run < MAX_RUN and row[i + run] == row[i]:
+            run += 1
+        if run >= 3:  # shorter runs are cheaper as literals
+            flush()
+            out.append(0x80 | (run - 1))
+            out.append(row[i])
+        else:
+            literal.extend(row[i : i + run])
+        i += run
+    flush()
+    return bytes(out)
+
+
+def encode(width, height, palette, pixels):
+    """Return the compressed bitmap file contents."""
+    if len(palette) > 256:
+        raise ValueError("At most 256 colors are supported.")
+
+    out = bytearray(struct.pack(RLE_HEADER, RLE_MAGIC, 1, width, height, len(palette)))
+    for color in palette:
+        out += struct.pack(">H", color)
+    for y in range(height):
+        row = encode_row(pixels[y * width : (y + 1) * width])
+        out += struct.pack(">H", len(row)) + row
+    return bytes(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input", help="bitmap module (.py) or image file")
+    parser.add_argument("output", help="compressed bitmap file to write")
+    parser.add_argument("--index", type=int, default=0, help="bitmap index in a module")
+    parser.add_argument("--colors", type=int, default=256, help="palette size for images")
+    args = parser.parse_args()
+
+    if args.input.endswith(".py"):
+        width, height, palette, pixels = load_module(args.input, args.index)
+    else:
+        width, height, palette, pixels = load_image(args.input, args.colors)
+
+    data = encode(width, height, palette, pixels)
+    with open(args.output, "wb") as f:
+        f.write(data)
+
+    print(
+        f"{args.output}: {width}x{height}, {len(palette)} colors, {len(data)} bytes"
+        f" ({width * height * 2} bytes as RGB565)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,18 @@
 import time
 from machine import Pin #导入Pin模块
 
+import modules.config as config
 import modules.now_recv as now
+import modules.params as params
 
+from modules.battery import BatteryMonitor
+from modules.heading import FieldCentric, HeadingHold
+from modules.imu import IMU
 from modules.motion import RobotChassis
+from modules.planner import Planner
+from modules.pose import Pose
+from modules.stall import StallDetector
+from modules.wheel_speed import MAX_COUNTS
 from modules.utils import TimeDiff, map_value, limit_value
 
 time.sleep(1)  # 防止上电停不下来程序
@@ -13,25 +22,147 @@ LED=Pin(15,Pin.OUT) #构建led对象，GPIO46,输出
 LED.value(1) #点亮LED，也可以使用led.on()
 
 motor_pins = [1, 2, 14, 13, 38, 36, 8, 10]
-robot = RobotChassis(motor_pins)
+encoder_pins = [4, 6, 39, 40, 21, 34, 12, 11]
 
-scale_x = 0.8
-scale_y = 0.8
-scale_w = 0.4
+BATTERY_PIN = None  # 电池分压接到的 ADC 引脚, 接好后填写, 分压比等参数见 config.json 的 battery
+
+HEADING_HOLD = True  # 用 IMU 航向保持直线行驶
+FIELD_CENTRIC = True  # 允许手柄切换到场地坐标系(手柄 Start 键), R1 键把当前方向设为航向零点
+
+MODE_FIELD = 7         # 手柄 data[7] 为这个值时使用场地坐标系, 见 controler/modules/gamepad.py
+BUTTON_ZERO = 1 << 6   # data[6] 的 R1 位
+BUTTON_ROUTE = 1 << 7  # data[6] 的 L1 位: 闭环时执行一遍 ROUTE, 执行中再按一次取消
+
+ROUTE = ((4000, 0, 0), (-4000, 0, 0))  # 相对位移 (前进, 侧向, 旋转), 单位: 编码器脉冲, config.json 的 route 可以覆盖
+
+CLOSED_LOOP = False  # 编码器接好并用 modules/sysid.py + tools/sysid_fit.py 标定后改为 True
+
+# 加载 flash 里的标定结果(tools/sysid_fit.py 生成), 覆盖默认参数
+config.load()
+for name, value in config.get("params", {}).items():
+    params.set_param(name, value)
+
+robot = RobotChassis(motor_pins, encoder_pins if CLOSED_LOOP else None,
+                     max_counts=config.get("max_counts", MAX_COUNTS))
+
+calibration = config.get("motors")
+if calibration:
+    robot.motors.calibrate(calibration)  # 死区和起步补偿
+    if robot.speed_controller is not None:
+        robot.speed_controller.set_feedforward([motor.get("gain") for motor in calibration])
+robot.shaper.set_limits(accel=params.get("accel"), jerk=params.get("jerk"))
+
+imu = None
+if HEADING_HOLD or FIELD_CENTRIC:
+    try:
+        imu = IMU()
+        imu.calibrate()  # 上电时保持静止
+        imu.start()      # 后台持续采样, 场地坐标系和航向保持只读缓存的航向
+        if HEADING_HOLD:
+            robot.heading_hold = HeadingHold(imu, **config.get("heading", {}))
+        if FIELD_CENTRIC:
+            robot.field_centric = FieldCentric(imu)
+    except (OSError, RuntimeError) as e:
+        print(f"IMU 初始化失败, 不使用航向保持和场地坐标系: {e}")
+        imu = None
+
+
+def zero_heading():
+    """ 当前车头方向设为航向零点(场地坐标系的前方) """
+    imu.zero()
+    if robot.heading_hold is not None:
+        robot.heading_hold.reset()
+
+if BATTERY_PIN is not None:
+    battery = BatteryMonitor(BATTERY_PIN, **config.get("battery", {}))
+    battery.attach(robot.motors)  # 电压补偿系数推给电机, 控制循环不读 ADC
+    battery.start()
+
+
+def on_shaper_param(name, value):
+    """ 手柄菜单修改指令整形参数 """
+    if name in ("accel", "jerk"):
+        robot.shaper.set_limits(**{name: value})
+
+
+params.on_change(on_shaper_param)
+
+if robot.speed_controller is not None:
+    robot.speed_controller.set_gains(params.get("kp"), params.get("ki"), params.get("kd"))
+
+    def on_param(name, value):
+        """ 手柄菜单修改 PID 参数时立即生效 """
+        if name in ("kp", "ki", "kd"):
+            robot.speed_controller.set_gains(**{name: value})
+
+    params.on_change(on_param)
+
+stall = None
+planner = None
+if robot.encoders is not None:
+    # 按里程计走相对位移, 在控制循环里每个周期 tick() 一次
+    planner = Planner(robot, robot.encoders, **config.get("planner", {}))
+
+    # 世界坐标系航位推算, 有 IMU 时用 IMU 偏航角; 换算系数标定后写入 config.json 的 pose
+    robot.encoders.pose = Pose(robot.model, imu=imu, period=robot.encoders.period, **config.get("pose", {}))
+
+    stall = StallDetector(robot.motors, robot.encoders, config.get("max_counts", MAX_COUNTS),
+                          controller=robot.speed_controller)
+
+    def on_stall(wheel, state):
+        """ 堵转事件: 打印并广播给手柄 """
+        print(f"堵转 {wheel}: {state}")
+        now.send_event({"E": "stall", "W": wheel, "S": state})
+
+    stall.on_event(on_stall)
+
+zero_pressed = False
+route_pressed = False
 
 while True:
-    data = now.read_espnow()
-    data = now.process_data(data)
+    packet = now.read_espnow()
+    raw = packet[0]
+    if raw and robot.field_centric is not None:
+        robot.field_centric.enabled = raw[7] == MODE_FIELD
+        pressed = bool(raw[6] & BUTTON_ZERO)
+        if pressed and not zero_pressed:  # 按下沿触发一次
+            zero_heading()
+        zero_pressed = pressed
+    if raw and planner is not None:
+        pressed = bool(raw[6] & BUTTON_ROUTE)
+        if pressed and not route_pressed:
+            if planner.busy:
+                planner.cancel()
+            else:
+                planner.follow(config.get("route", ROUTE))
+        route_pressed = pressed
+
+    data = now.process_data(packet)
 
-    if data:
+    planning = planner is not None and planner.busy
+    if planning:
+        # 规划执行中摇杆不生效, 急停取消规划; 整形器继续计时并回到 0, 结束后从静止接手
+        if data and data[1] > 10 and data[2] > 10 and data[3] > 10 and data[4] > 10:
+            planner.cancel()
+            robot.emergency_stop()
+        robot.set_command(0, 0, 0)
+        robot.shaper.update()
+        planner.tick()
+    elif raw is now.KEEP:
+        pass  # 这一次只收到菜单参数修改, 保持上一帧的指令, 不刹车
+    elif data:
         print(data)
         if data[1] > 10 and data[2] > 10 and data[3] > 10 and data[4] > 10:
-            robot.stop()
+            robot.emergency_stop()
         else:
-            robot.move(-data[1]*scale_x, data[2]*scale_y, -data[3]*scale_w)
+            robot.set_command(-data[1]*params.get("scale_x"), data[2]*params.get("scale_y"), -data[3]*params.get("scale_w"))
     else:
-        robot.stop()
+        robot.set_command(0, 0, 0)
 
+    if not planning:
+        robot.update()  # 指令整形后输出到电机, 整形按实测的循环周期计算
+    if stall is not None:
+        stall.update()
     time.sleep(0.01)
 
     # robot.turn_left(40)
@@ -0,0 +1,214 @@
+# 继电反馈 PID 自整定: 每个轮子在工作点附近做继电(开关)控制, 产生等幅振荡,
+# 由振幅和周期得到临界增益 Ku 和临界周期 Tu, 再按 Ziegler-Nichols 或 Tyreus-Luyben 计算 PID 参数
+
+import math
+import time
+
+import modules.config as config
+from modules.wheel_speed import MAX_COUNTS
+
+ZN_PI = "zn_pi"
+ZN_PID = "zn_pid"
+TL_PI = "tl_pi"
+TL_PID = "tl_pid"
+
+
+def gains(ku, tu, rule=TL_PI):
+    """
+    由临界增益和临界周期计算 PID 参数
+    @param ku: 临界增益, PWM 百分比 / (脉冲/周期)
+    @param tu: 临界周期, 单位: 秒
+    @return: (kp, ki, kd), ki 单位 1/秒, kd 单位 秒, 与 PID / MultiPID 一致
+    """
+    if rule == ZN_PI:
+        kp, ti, td = 0.45 * ku, tu / 1.2, 0.0
+    elif rule == ZN_PID:
+        kp, ti, td = 0.6 * ku, tu / 2, tu / 8
+    elif rule == TL_PI:
+        kp, ti, td = ku / 3.2, 2.2 * tu, 0.0
+    elif rule == TL_PID:
+        kp, ti, td = ku / 2.2, 2.2 * tu, tu / 6.3
+    else:
+        raise ValueError("unknown tuning rule: %s" % rule)
+    return kp, kp / ti, kp * td
+
+
+class RelayTuner:
+    def __init__(self, motors, encoders, max_counts=MAX_COUNTS, speed=0.5, amplitude=20,
+                 hysteresis=1, cycles=8, skip=2, timeout=3.0, controller=None):
+        """
+        逐个轮子做继电反馈实验, 由编码器定时器驱动
+        @param motors: 电机组, 需要 set_speed_lf/rf/rb/lb
+        @param encoders: 编码器组, 每个周期调用 callback(encoders)
+        @param max_counts: 100% PWM 时的 脉冲/周期, 用于计算工作点的前馈 PWM
+        @param speed: 工作点, 最大速度的比例
+        @param amplitude: 继电输出幅值, PWM 百分比
+        @param hysteresis: 继电回差, 脉冲/周期, 防止测量噪声引起抖动
+        @param cycles: 记录的振荡周期数
+        @param skip: 开始时丢弃的周期数, 等待振荡稳定
+        @param timeout: 每个轮子的最长时间, 单位: 秒
+        @param controller: 正在运行的 WheelSpeedController, 实验期间暂停它的定时器, 否则它会覆盖继电输出
+        """
+        self.motors = motors
+        self.encoders = encoders
+        self.period = encoders.period
+        self.setpoint = max_counts * speed
+        self.bias = speed * 100
+        self.amplitude = amplitude
+        self.hysteresis = hysteresis
+        self.cycles = cycles
+        self.skip = skip
+        self.max_samples = int(timeout / self.period)
+        self.controller = controller
+        self._paused = False
+        self._setters = (motors.set_speed_lf, motors.set_speed_rf,
+                         motors.set_speed_rb, motors.set_speed_lb)
+
+        self.results = [None, None, None, None]  # 每个轮子的 (Ku, Tu), 失败为 None
+        self.running = False
+        self.wheel = 0
+
+    def start(self):
+        self.wheel = 0
+        controller = self.controller
+        if controller is not None and controller._timer is not None:
+            controller.stop()
+            self._paused = True
+        self.running = True
+        self._begin()
+        self.encoders.callback = self.sample
+
+    def stop(self):
+        self.running = False
+        self.encoders.callback = None
+        for setter in self._setters:
+            setter(0)
+        if self._paused:  # 恢复速度闭环, 清空暂停前的积分
+            self._paused = False
+            self.controller.pid.reset()
+            self.controller.start()
+
+    def _begin(self):
+        """ 开始一个轮子的实验 """
+        self._samples = 0
+        self._high = True       # 当前继电输出方向
+        self._switches = 0      # 向下切换的次数, 每次为一个周期的开始
+        self._last_switch = 0
+        self._peak = -math.inf
+        self._valley = math.inf
+        self._amp_sum = 0.0
+        self._period_sum = 0
+        self._measured = 0
+        self._setters[self.wheel](self.bias + self.amplitude)
+
+    def _finish(self, result):
+        self._setters[self.wheel](0)
+        self.results[self.wheel] = result
+        self.wheel += 1
+        if self.wheel >= 4:
+            self.stop()
+        else:
+            self._begin()
+
+    def sample(self, encoders):
+        """ 编码器定时器回调: 继电控制并记录振荡的峰谷和周期 """
+        if not self.running:
+            return
+
+        y = abs(encoders.speed[self.wheel])
+        n = self._samples
+        self._samples = n + 1
+        if y > self._peak:
+            self._peak = y
+        if y < self._valley:
+            self._valley = y
+
+        if self._high and y > self.setpoint + self.hysteresis:
+            self._high = False
+            # 向下切换: 一个振荡周期结束
+            if self._switches > self.skip:
+                self._amp_sum += (self._peak - self._valley) / 2
+                self._period_sum += n - self._last_switch
+                self._measured += 1
+            self._switches += 1
+            self._last_switch = n
+            self._peak = -math.inf
+            self._valley = math.inf
+            self._setters[self.wheel](self.bias - self.amplitude)
+
+        elif not self._high and y < self.setpoint - self.hysteresis:
+            self._high = True
+            self._setters[self.wheel](self.bias + self.amplitude)
+
+        if self._measured >= self.cycles:
+            a = self._amp_sum / self._measured
+            tu = self._period_sum / self._measured * self.period
+            # 带回差的继电描述函数
+            a = math.sqrt(max(a * a - self.hysteresis * self.hysteresis, 1e-6))
+            ku = 4 * self.amplitude / (math.pi * a)
+            self._finish((ku, tu))
+        elif n >= self.max_samples:
+            self._finish(None)  # 没有形成稳定振荡
+
+    def gains(self, rule=TL_PI):
+        """ 四个轮子平均的 PID 参数, MultiPID 四个通道共用一组参数 """
+        done = [r for r in self.results if r is not None]
+        if not done:
+            return None
+        ku = sum(r[0] for r in done) / len(done)
+        tu = sum(r[1] for r in done) / len(done)
+        return gains(ku, tu, rule)
+
+    def save(self, rule=TL_PI):
+        """ 把结果写入 flash 配置, 下次开机时生效 """
+        result = self.gains(rule)
+        if result is None:
+            return None
+        kp, ki, kd = result
+        params = config.get("params", {})
+        params.update({"kp": round(kp, 4), "ki": round(ki, 4), "kd": round(kd, 4)})
+        config.update_all({"autotune": {"rule": rule, "results": self.results}, "params": params})
+        return result
+
+    def run(self, rule=TL_PI):
+        """ 在小车上执行: 阻塞直到四个轮子都完成, 保存并返回 (kp, ki, kd), 传入了 controller 时立即生效 """
+        self.start()
+        while self.running:
+            time.sleep_ms(50)
+        result = self.save(rule)
+        if result is not None and self.controller is not None:
+            self.controller.set_gains(*result)
+        return result
+
+
+if __name__ == "__main__":
+    # 在电脑上用仿真电机测试: python -m modules.autotune
+    from modules.sim_plant import make_sim
+    from modules.wheel_speed import WheelSpeedController
+
+    motors, encoders = make_sim()
+    tuner = RelayTuner(motors, encoders)
+    tuner.start()
+    steps = 0
+    while tuner.running:
+        encoders.step()
+        steps += 1
+    print(f"用时 {steps * encoders.period:.2f} 秒, 结果 (Ku, Tu): {tuner.results}")
+
+    for rule in (ZN_PI, ZN_PID, TL_PI, TL_PID):
+        kp, ki, kd = tuner.gains(rule)
+        controller = WheelSpeedController(motors, encoders, kp=kp, ki=ki, kd=kd)
+        controller.set_closed_loop(True)
+        for plant in motors.plants:
+            plant.supply = 0.8  # 电池电压下降, 只靠前馈达不到目标
+        controller.set_velocity(40, 0, 0)
+        trace = []
+        for i in range(60):
+            encoders.step()
+            controller.update()
+            trace.append(encoders.speed[0])
+        print(f"{rule}: kp={kp:.3f} ki={ki:.2f} kd={kd:.4f}  左前轮速度 {trace[::6]}")
+        controller.set_velocity(0, 0, 0)
+        for i in range(100):
+            encoders.step()
+            controller.update()
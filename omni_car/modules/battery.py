@@ -0,0 +1,138 @@
+# 电池电压监测和 PWM 电压补偿
+# 低频后台任务读取 ADC (过采样 + 一阶低通), 算出补偿系数缓存起来推给电机,
+# 控制循环只读缓存的系数, 不做 ADC 操作
+
+OK = 0        # 电压正常
+LOW = 1       # 低电压, 限制输出
+SHUTDOWN = 2  # 电压过低, 停止输出
+
+
+class BatteryMonitor:
+    def __init__(self, adc, divider=3.0, nominal=7.4, throttle=6.8, cutoff=6.4,
+                 samples=16, alpha=0.2, min_scale=0.5, max_boost=1.3, period_ms=200):
+        """
+        @param adc: ADC 引脚号, 或有 read_uv() 方法的对象(电脑上测试用)
+        @param divider: 分压比, 电池电压 = ADC 电压 * divider
+        @param nominal: 补偿的目标电压, 电池在这个电压时系数为 1
+        @param throttle: 低于此电压开始限制输出, 到 cutoff 时降到 min_scale
+        @param cutoff: 低于此电压停止输出, 保护电池
+        @param samples: 每次读取的过采样次数
+        @param alpha: 一阶低通系数, 越小越平滑
+        @param min_scale: 低电压限制的最小输出比例
+        @param max_boost: 补偿系数上限, 电压低时占空比最多放大的倍数
+        @param period_ms: 后台读取周期
+        """
+        if isinstance(adc, int):
+            from machine import ADC, Pin
+
+            adc = ADC(Pin(adc))
+            adc.atten(ADC.ATTN_11DB)  # 量程增大到约 3.3V
+        self.adc = adc
+
+        self.divider = divider
+        self.nominal = nominal
+        self.throttle = throttle
+        self.cutoff = cutoff
+        self.samples = samples
+        self.alpha = alpha
+        self.min_scale = min_scale
+        self.max_boost = max_boost
+        self.period_ms = period_ms
+
+        self.voltage = self.read()  # 滤波后的电池电压
+        self.state = OK
+        self.scale = 1.0            # 缓存的补偿系数, 控制循环直接读取
+
+        self._motors = []
+        self._timer = None
+        self.update()
+
+    def read(self):
+        """ 过采样读取一次电池电压, 单位: 伏 """
+        total = 0
+        read_uv = self.adc.read_uv  # 使用芯片内的校准数据
+        for _ in range(self.samples):
+            total += read_uv()
+        return total / self.samples / 1_000_000 * self.divider
+
+    def attach(self, motors):
+        """ 注册电机组(需要 set_supply_scale), 系数变化时推送 """
+        self._motors.append(motors)
+        motors.set_supply_scale(self.scale)
+
+    def update(self, *args):
+        """ 后台任务: 读取电压, 更新补偿系数和状态 """
+        v = self.voltage + (self.read() - self.voltage) * self.alpha
+        self.voltage = v
+
+        if self.state == SHUTDOWN:
+            return  # 停机后保持, 电机停转后电压回升也不自动恢复, 需要 reset()
+
+        if v <= self.cutoff:
+            state = SHUTDOWN
+            scale = 0.0
+        else:
+            scale = min(self.nominal / v, self.max_boost)  # 保持等效电压不变
+            if v < self.throttle:
+                state = LOW
+                ratio = (v - self.cutoff) / (self.throttle - self.cutoff)
+                scale *= self.min_scale + (1 - self.min_scale) * ratio
+            else:
+                state = OK
+
+        # 变化很小时不推送, 避免电机反复写占空比
+        if state != self.state or abs(scale - self.scale) > 0.005:
+            self.scale = scale
+            for motors in self._motors:
+                motors.set_supply_scale(scale)
+        self.state = state
+
+    def reset(self):
+        """ 换电池后解除停机状态 """
+        self.voltage = self.read()
+        self.state = OK
+        self.update()
+
+    def start(self, timer_id=3):
+        """ 用定时器在后台周期读取, 回调通过 schedule 在主线程执行 """
+        import micropython
+        from machine import Timer
+
+        def tick(timer):
+            try:
+                micropython.schedule(self.update, None)
+            except RuntimeError:
+                pass
+
+        self._timer = Timer(timer_id)
+        self._timer.init(period=self.period_ms, mode=Timer.PERIODIC, callback=tick)
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+
+
+if __name__ == "__main__":
+    # 在电脑上模拟电池放电: python -m modules.battery
+    class FakeADC:
+        def __init__(self):
+            self.voltage = 8.4
+
+        def read_uv(self):
+            return int(self.voltage / 3.0 * 1_000_000)
+
+    class Report:
+        def set_supply_scale(self, scale):
+            self.scale = scale
+
+    adc = FakeADC()
+    battery = BatteryMonitor(adc)
+    motors = Report()
+    battery.attach(motors)
+
+    while adc.voltage > 6.0:
+        for _ in range(5):
+            battery.update()
+        print(f"电池 {adc.voltage:.2f}V  滤波 {battery.voltage:.2f}V  系数 {motors.scale:.3f}  状态 {battery.state}")
+        adc.voltage -= 0.2
@@ -0,0 +1,39 @@
+# 保存在 flash 里的标定和调参结果, JSON 格式, 开机时加载
+# 由电脑端 tools/sysid_fit.py 生成, 或由小车上的自整定程序写入
+
+import json
+
+CONFIG_PATH = "/config.json"
+
+_config = {}
+
+
+def load(path=CONFIG_PATH):
+    """ 读取配置文件, 文件不存在或损坏时返回空配置 """
+    global _config
+    try:
+        with open(path) as f:
+            _config = json.load(f)
+    except (OSError, ValueError):
+        _config = {}
+    return _config
+
+
+def get(key, default=None):
+    return _config.get(key, default)
+
+
+def update(key, value, path=CONFIG_PATH):
+    """ 修改一项并写回 flash """
+    update_all({key: value}, path)
+
+
+def update_all(items, path=CONFIG_PATH):
+    """ 修改多项, 只写一次 flash """
+    _config.update(items)
+    save(path)
+
+
+def save(path=CONFIG_PATH):
+    with open(path, "w") as f:
+        json.dump(_config, f)
@@ -6,7 +6,16 @@
 # Copyright (c) 2017-2022 Peter Hinch
 # Released under the MIT License (MIT) - see LICENSE file
 
-from machine import Pin # type: ignore
+try:
+    from machine import Pin # type: ignore
+except ImportError:  # 电脑上只能使用 FAKE 后端
+    Pin = None
+
+IRQ = "irq"    # 引脚中断, 每个边沿一次 Python 中断
+PCNT = "pcnt"  # ESP32 硬件脉冲计数器, 正交解码不占用 CPU
+FAKE = "fake"  # 软件模拟的 PCNT, 电脑上测试用
+
+PCNT_LIMIT = 32000  # 硬件计数器到 ±PCNT_LIMIT 时归零, 16 位有符号范围内
 
 class Encoder:
     """ 
@@ -54,6 +63,10 @@ class Encoder:
         if value is not None:
             self._pos = value
         return self._pos
+
+    def poll(self):
+        """ 采样周期里调用, 接口同 PCNTEncoder; 计数由引脚中断累加, 直接返回 """
+        return self._pos
     
     def update_speed(self):  # pulse/period
         self.speed = (self._pos - self._prev_pos)
@@ -64,9 +77,125 @@ class Encoder:
         self._prev_pos = 0
 
 
+class PCNTEncoder:
+    """
+    ESP32 硬件脉冲计数器(PCNT)正交解码, 接口同 Encoder, 边沿不产生中断
+    硬件计数器只有 16 位, 由采样周期里的 poll() 读取增量累加到 _pos, 两次读取之间的移动量要小于 limit / 2
+    只有 poll() 读硬件计数器并修改累加状态, 定时器回调里调用; 主线程的 value()/position()/reset() 只读写 _pos,
+    不会与定时器回调交错执行同一段读-改-写, 增量不会重复累加或丢失
+    @param pin_x: Pin number for X channel
+    @param pin_y: Pin number for Y channel
+    @param dt: Period of update in seconds
+    @param scale: Scale factor for position
+    @param unit: PCNT 单元号, ESP32-S3 有 4 个, 每个编码器占一个单元的两个通道
+    @param limit: 计数器范围 ±limit, 到达时归零
+    @param filter_ns: 短于这个时间的脉冲视为毛刺
+    @param counter: 有 value() 方法的计数器, None 时按引脚创建 esp32.PCNT
+    """
+    def __init__(self, pin_x: int, pin_y: int, dt: float = 0.01, scale: float = 1, unit: int = 0,
+                 limit: int = PCNT_LIMIT, filter_ns: int = 1000, counter=None):
+        self.scale = scale
+        self.limit = limit
+        self._half = limit // 2
+        if counter is None:
+            import esp32
+
+            pin_x = Pin(pin_x, Pin.IN, Pin.PULL_UP)
+            pin_y = Pin(pin_y, Pin.IN, Pin.PULL_UP)
+            counter = esp32.PCNT(unit, min=-limit, max=limit, filter=filter_ns)
+            # 四倍频, 计数方向与 Encoder 的中断版本一致
+            counter.init(channel=0, pin=pin_x, rising=esp32.PCNT.INCREMENT, falling=esp32.PCNT.DECREMENT,
+                         mode_pin=pin_y, mode_high=esp32.PCNT.REVERSE)
+            counter.init(channel=1, pin=pin_y, rising=esp32.PCNT.DECREMENT, falling=esp32.PCNT.INCREMENT,
+                         mode_pin=pin_x, mode_high=esp32.PCNT.REVERSE)
+            counter.value(0)
+            counter.start()
+        self.counter = counter
+        self._last = counter.value()
+        self._pos = 0
+        self._prev_pos = 0
+        self.speed = 0
+
+    def position(self, value=None):
+        if value is not None:
+            self.value(round(value / self.scale))
+        return self.value() * self.scale
+
+    def value(self, value=None):
+        """ 上次 poll() 时的累计位置, 给出 value 时设置位置 """
+        if value is not None:
+            self._pos = value
+        return self._pos
+
+    def poll(self):
+        """ 读取硬件计数器, 把增量累加到 _pos 并返回, 只在采样周期里调用 """
+        count = self.counter.value()
+        delta = count - self._last
+        self._last = count
+        # 计数器到 ±limit 归零, 增量跳变约 limit 时按溢出处理
+        if delta > self._half:
+            delta -= self.limit
+        elif delta < -self._half:
+            delta += self.limit
+        self._pos += delta
+        return self._pos
+
+    def update_speed(self):  # pulse/period
+        pos = self.poll()
+        self.speed = pos - self._prev_pos
+        self._prev_pos = pos
+
+    def reset(self):
+        self._pos = 0
+        self._prev_pos = 0
+
+
+class FakeCounter:
+    """ 模拟 esp32.PCNT 的计数和归零行为, 用 add() 输入脉冲 """
+    def __init__(self, limit: int = PCNT_LIMIT):
+        self.limit = limit
+        self.count = 0
+
+    def add(self, pulses):
+        count = self.count + pulses
+        while count >= self.limit:
+            count -= self.limit
+        while count <= -self.limit:
+            count += self.limit
+        self.count = count
+
+    def value(self, value=None):
+        if value is not None:
+            self.count = value
+        return self.count
+
+
+def make_encoder(backend, pin_x, pin_y, dt=0.01, unit=0):
+    """
+    按后端名创建编码器
+    @param backend: IRQ, PCNT 或 FAKE
+    @param unit: PCNT 单元号
+    """
+    if backend == IRQ:
+        return Encoder(pin_x, pin_y, dt=dt)
+    if backend == PCNT:
+        return PCNTEncoder(pin_x, pin_y, dt=dt, unit=unit)
+    if backend == FAKE:
+        return PCNTEncoder(pin_x, pin_y, dt=dt, counter=FakeCounter())
+    raise ValueError("unknown encoder backend: %s" % backend)
+
+
 if __name__ == '__main__':
 
-    from machine import Pin
+    if Pin is None:
+        # 在电脑上验证 PCNT 溢出处理: 每个周期 3000 个脉冲, 计数器会多次归零. python -m modules.encoder
+        encoder = make_encoder(FAKE, 4, 6)
+        for pulses in (3000,) * 30 + (-3000,) * 50:
+            encoder.counter.add(pulses)
+            encoder.update_speed()
+        print(f"位置 {encoder.position()} (应为 -60000), 速度 {encoder.speed}, 硬件计数 {encoder.counter.value()}")
+        raise SystemExit
+
     import time
 
 #     AH1 = Pin(4, Pin.IN, Pin.PULL_UP)
@@ -0,0 +1,112 @@
+# 航向保持: 旋转摇杆回中时, 用 IMU 航向闭环修正 v_w, 直线行驶不再慢慢转偏
+# 场地坐标系: 按 IMU 航向把平移指令从场地坐标系转到车身坐标系
+
+import math
+import time
+
+from modules.imu import DEG2RAD, wrap180
+from modules.pid import MultiPID
+
+
+class HeadingHold:
+    def __init__(self, imu, kp=3.0, ki=3.0, kd=0.05, threshold=3.0, limit=40, period=0.01):
+        """
+        @param imu: 有 heading(度) 属性的对象, 例如 modules.imu.IMU
+        @param kp, ki, kd: 航向 PID, 输入为航向误差(度), 输出为 v_w 修正量
+        @param threshold: |v_w| 小于这个值视为旋转摇杆回中
+        @param limit: 修正量上限, 与 v_w 单位相同
+        @param period: update() 的名义调用周期, 单位: 秒, 只在电脑上(没有 ticks_us)使用
+        """
+        self.imu = imu
+        self.threshold = threshold
+        # update() 跟着主循环走, 实际周期随 espnow 和打印变化, 小车上 PID 按实测间隔计算
+        dt = None if hasattr(time, "ticks_us") else period
+        # 测量值用 -误差, 设定值为 0: 微分作用在航向上, 角度跨过 ±180 时不会跳变
+        self.pid = MultiPID(1, kp, ki, kd, dt=dt, output_limits=(-limit, limit))
+        self._error = [0.0]
+
+        self.enabled = True
+        self.holding = False
+        self.target = 0.0  # 保持的航向, 度
+
+    def set_gains(self, kp=None, ki=None, kd=None):
+        self.pid.set_gains(kp, ki, kd)
+
+    def update(self, v_w, moving=True):
+        """
+        输入旋转指令, 返回修正后的旋转指令
+        操作者在转动时跟随当前航向, 松开摇杆的瞬间记下航向并开始保持
+        @param moving: 是否有平移指令, 停车时不修正, 避免电机在原地来回抖
+        """
+        heading = self.imu.heading
+        if not self.enabled or not moving or abs(v_w) > self.threshold:
+            self.holding = False
+            return v_w
+
+        if not self.holding:
+            self.holding = True
+            self.target = heading
+            self.pid.reset()
+
+        self._error[0] = -wrap180(self.target - heading)
+        return v_w + self.pid.update(self._error)[0]
+
+    def reset(self):
+        """ 航向零点改变后重新记录保持的航向 """
+        self.holding = False
+
+
+class FieldCentric:
+    def __init__(self, imu, threshold=0.5):
+        """
+        @param imu: 有 heading(度, 逆时针为正) 属性的对象, 例如 modules.imu.IMU
+        @param threshold: 航向变化超过这个角度(度)才重新计算 sin/cos
+        """
+        self.imu = imu
+        self.threshold = threshold
+        self.enabled = False
+
+        self._angle = 0.0  # 缓存的 sin/cos 对应的航向
+        self._sin = 0.0
+        self._cos = 1.0
+
+    def rotate(self, v_x, v_y):
+        """
+        场地坐标系的平移指令 -> 车身坐标系, 未启用时原样返回
+        x 为航向零点方向, y 向右, 与 RobotChassis.move 一致
+        """
+        if not self.enabled:
+            return v_x, v_y
+
+        heading = self.imu.heading
+        if abs(wrap180(heading - self._angle)) > self.threshold:
+            self._angle = heading
+            rad = heading * DEG2RAD
+            self._sin = math.sin(rad)
+            self._cos = math.cos(rad)
+
+        s = self._sin
+        c = self._cos
+        return c * v_x - s * v_y, s * v_x + c * v_y
+
+
+if __name__ == "__main__":
+    # 在电脑上测试: 车身受到一个固定的偏转干扰, 航向保持把它拉回来. python -m modules.heading
+    class FakeIMU:
+        heading = 0.0
+
+    imu = FakeIMU()
+    hold = HeadingHold(imu)
+    disturbance = 20.0  # 度/秒, 例如左右轮摩擦不一致
+    for tick in range(300):
+        v_w = hold.update(0)
+        # 假设 v_w = 100 时约 180 度/秒
+        imu.heading = wrap180(imu.heading + (v_w * 1.8 + disturbance) * 0.01)
+        if tick % 30 == 0:
+            print(f"{tick * 10:5d} ms  航向 {imu.heading:6.2f}  修正 {v_w:6.2f}")
+
+    # 车头左转 90 度后, 场地坐标系的"前进"应变成车身的向右平移
+    field = FieldCentric(imu)
+    field.enabled = True
+    imu.heading = 90.0
+    print("场地前进 -> 车身 (%.2f, %.2f)" % field.rotate(100, 0))
@@ -0,0 +1,109 @@
+# IMU 封装: ICM42688P 读取 + SensorFusion (Mahony) 姿态融合, 输出航向角和 z 轴角速度
+# 接线与 test/imu.py 相同
+
+import math
+import time
+
+from modules.SensorFusion import SensorFusion
+
+DEG2RAD = math.pi / 180.0
+
+_ticks_us = getattr(time, "ticks_us", None)  # 电脑上没有, 按固定周期计算
+
+
+def wrap180(angle):
+    """ 角度调整到 [-180, 180) """
+    return (angle + 180) % 360 - 180
+
+
+class IMU:
+    def __init__(self, device=None, period=0.01):
+        """
+        @param device: 有 read_accelerometer() / read_gyroscope() 的传感器, None 时按默认接线创建 ICM42688P
+        @param period: update() 的名义调用周期, 单位: 秒, 融合的 dt 按实测间隔, 第一次和电脑上用这个值
+        """
+        if device is None:
+            from machine import Pin, SPI
+            from lib.icm42688 import ICM42688P
+
+            spi = SPI(1, sck=Pin(3), mosi=Pin(5), miso=Pin(7))
+            device = ICM42688P(spi, cs_pin=9)
+            device.initialize()
+        self.device = device
+        self.period = period
+        self.fusion = SensorFusion()
+
+        self.bias = [0.0, 0.0, 0.0]  # 陀螺仪零偏, 度/秒
+        self.yaw = 0.0               # 融合后的偏航角, 度
+        self.rate = 0.0              # z 轴角速度(已去零偏), 度/秒, 逆时针为正
+        self.offset = 0.0            # 航向零点, 见 zero()
+        self.max_dt = 5 * period     # 实测间隔上限, 卡顿后不会一次积分太多
+        self._last_us = None
+        self._timer = None
+
+    def calibrate(self, samples=200):
+        """ 静止时采样求陀螺仪零偏 """
+        total = [0.0, 0.0, 0.0]
+        for _ in range(samples):
+            g = self.device.read_gyroscope()
+            for i in range(3):
+                total[i] += g[i]
+        for i in range(3):
+            self.bias[i] = total[i] / samples
+
+    def update(self, *args):
+        """ 读取一次传感器并更新融合结果, 按 period 周期调用 """
+        ax, ay, az = self.device.read_accelerometer()
+        gx, gy, gz = self.device.read_gyroscope()
+        bias = self.bias
+        gx -= bias[0]
+        gy -= bias[1]
+        gz -= bias[2]
+
+        # Mahony 算法的角速度单位为 弧度/秒
+        fusion = self.fusion
+        fusion.MahonyUpdateIMU(gx * DEG2RAD, gy * DEG2RAD, gz * DEG2RAD, ax, ay, az, self._elapsed())
+        self.yaw = fusion.getYaw()
+        self.rate = gz
+
+    def _elapsed(self):
+        """ 距上次 update() 的实际时间, 调用周期不准时航向积分也不会按比例偏 """
+        if _ticks_us is None:
+            return self.period
+        now = _ticks_us()
+        last = self._last_us
+        self._last_us = now
+        if last is None:
+            return self.period
+        dt = time.ticks_diff(now, last) / 1_000_000
+        if dt <= 0:
+            return self.period
+        return dt if dt < self.max_dt else self.max_dt
+
+    @property
+    def heading(self):
+        """ 相对零点的航向角, 度, [-180, 180) """
+        return wrap180(self.yaw - self.offset)
+
+    def zero(self):
+        """ 把当前方向设为航向零点 """
+        self.offset = self.yaw
+
+    def start(self, timer_id=0):
+        """ 用定时器按 period 在后台持续采样, 回调通过 schedule 在主线程执行 """
+        import micropython
+        from machine import Timer
+
+        def tick(timer):
+            try:
+                micropython.schedule(self.update, None)
+            except RuntimeError:
+                pass  # 调度队列满, 跳过这一次
+
+        self._timer = Timer(timer_id)
+        self._timer.init(period=int(self.period * 1000), mode=Timer.PERIODIC, callback=tick)
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
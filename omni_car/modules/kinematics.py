@@ -0,0 +1,176 @@
+# 四轮全向底盘运动学
+# 轮子顺序统一为: 左前, 右前, 右后, 左后
+# 运动方向: x 前进为正, y 向右为正, w 逆时针(左转)为正, 与 RobotChassis.move 一致
+
+from array import array
+import math
+
+OMNI = "omni"        # 45° 安装的全向轮(X 型)
+MECANUM = "mecanum"  # 麦克纳姆轮
+
+POLARITY = (1, 1, -1, -1)  # 电机接线方向, 后轮反装
+
+
+class Kinematics:
+    def __init__(self, wheel=OMNI, radius=None, track=None, wheelbase=None, polarity=POLARITY):
+        """
+        底盘几何和运动学矩阵, 逆解和正解都由同一组参数算出, 保证一致
+        @param wheel: OMNI 或 MECANUM
+        @param radius: 轮子半径, 单位: 米; None 时使用归一化单位(轮速和运动量同一量纲)
+        @param track: 左右轮距, 单位: 米
+        @param wheelbase: 前后轴距, 单位: 米
+        @param polarity: 四个轮子的正转方向, 1 或 -1
+        """
+        self.wheel = wheel
+        self.radius = radius
+        self.track = track
+        self.wheelbase = wheelbase
+        self.polarity = polarity
+
+        if radius is None:
+            # 归一化: 平移和旋转系数都为 1, 与最初的混控公式相同
+            lin, rot, r = 1.0, 1.0, 1.0
+        elif wheel == MECANUM:
+            lin, rot, r = 1.0, (track + wheelbase) / 2, radius
+        elif wheel == OMNI:
+            lin, rot, r = math.sqrt(0.5), math.sqrt(track * track + wheelbase * wheelbase) / 2, radius
+        else:
+            raise ValueError("unknown wheel type: %s" % wheel)
+
+        # 逆解矩阵, 4x3 按行展开: 轮速 = M * (x, y, w)
+        signs = ((1, 1, -1),   # 左前
+                 (1, -1, 1),   # 右前
+                 (1, 1, 1),    # 右后
+                 (1, -1, -1))  # 左后
+        self.inv = array('f', [0.0] * 12)
+        for i in range(4):
+            p = polarity[i] / r
+            self.inv[i * 3] = signs[i][0] * lin * p
+            self.inv[i * 3 + 1] = signs[i][1] * lin * p
+            self.inv[i * 3 + 2] = signs[i][2] * rot * p
+
+        # 正解矩阵, 3x4 按行展开: 最小二乘解 (MᵀM)⁻¹Mᵀ
+        self.fwd = array('f', [0.0] * 12)
+        self._pinv()
+
+        self._vel = array('f', [0.0] * 3)
+        self._wheels = array('f', [0.0] * 4)
+
+    def _pinv(self):
+        """ 计算逆解矩阵的伪逆 """
+        m = self.inv
+        # MᵀM, 3x3 对称矩阵
+        g = [[sum(m[k * 3 + i] * m[k * 3 + j] for k in range(4)) for j in range(3)] for i in range(3)]
+
+        # 3x3 求逆
+        a, b, c = g[0]
+        d, e, f = g[1]
+        h, i, j = g[2]
+        det = a * (e * j - f * i) - b * (d * j - f * h) + c * (d * i - e * h)
+        if abs(det) < 1e-12:
+            raise ValueError("singular kinematics matrix")
+        inv_g = (((e * j - f * i) / det, (c * i - b * j) / det, (b * f - c * e) / det),
+                 ((f * h - d * j) / det, (a * j - c * h) / det, (c * d - a * f) / det),
+                 ((d * i - e * h) / det, (b * h - a * i) / det, (a * e - b * d) / det))
+
+        for row in range(3):
+            for k in range(4):
+                self.fwd[row * 4 + k] = sum(inv_g[row][n] * m[k * 3 + n] for n in range(3))
+
+    def inverse_into(self, vel, out):
+        """
+        逆解: 运动量 -> 四个轮子的速度, 结果写入 out, 不分配内存
+        @param vel: (x, y, w)
+        @param out: 长度为 4 的 array 或 list
+        """
+        m = self.inv
+        x = vel[0]
+        y = vel[1]
+        w = vel[2]
+        out[0] = m[0] * x + m[1] * y + m[2] * w
+        out[1] = m[3] * x + m[4] * y + m[5] * w
+        out[2] = m[6] * x + m[7] * y + m[8] * w
+        out[3] = m[9] * x + m[10] * y + m[11] * w
+        return out
+
+    def forward_into(self, wheels, out):
+        """
+        正解: 四个轮子的速度 -> 运动量(最小二乘), 结果写入 out, 不分配内存
+        @param wheels: 左前, 右前, 右后, 左后
+        @param out: 长度为 3 的 array 或 list
+        """
+        m = self.fwd
+        a = wheels[0]
+        b = wheels[1]
+        c = wheels[2]
+        d = wheels[3]
+        out[0] = m[0] * a + m[1] * b + m[2] * c + m[3] * d
+        out[1] = m[4] * a + m[5] * b + m[6] * c + m[7] * d
+        out[2] = m[8] * a + m[9] * b + m[10] * c + m[11] * d
+        return out
+
+    def inverse(self, v_x, v_y, v_w):
+        """ 逆解, 返回四个轮子的速度 """
+        vel = self._vel
+        vel[0] = v_x
+        vel[1] = v_y
+        vel[2] = v_w
+        w = self.inverse_into(vel, self._wheels)
+        return w[0], w[1], w[2], w[3]
+
+    def forward(self, v_lf, v_rf, v_rb, v_lb):
+        """ 正解, 返回 (x, y, w) """
+        wheels = self._wheels
+        wheels[0] = v_lf
+        wheels[1] = v_rf
+        wheels[2] = v_rb
+        wheels[3] = v_lb
+        v = self.forward_into(wheels, self._vel)
+        return v[0], v[1], v[2]
+
+
+DEFAULT = Kinematics()  # 归一化单位, RobotChassis 和 Encoders 默认使用
+
+
+def inverse(v_x, v_y, v_w):
+    """ 运动学逆解: 期望运动(前进, 侧向, 旋转) -> 四个轮子的速度 """
+    return DEFAULT.inverse(v_x, v_y, v_w)
+
+
+def forward(v_lf, v_rf, v_rb, v_lb):
+    """ 运动学正解: 四个轮子的速度 -> 运动(前进, 侧向, 旋转) """
+    return DEFAULT.forward(v_lf, v_rf, v_rb, v_lb)
+
+
+def normalize_into(wheels, max_speed=100):
+    """ 同 normalize, 直接缩放 wheels 里的四个值 """
+    peak = max(abs(wheels[0]), abs(wheels[1]), abs(wheels[2]), abs(wheels[3]))
+    if peak > max_speed:
+        scale = max_speed / peak
+        for i in range(4):
+            wheels[i] *= scale
+    return wheels
+
+
+def normalize(v1, v2, v3, v4, max_speed=100):
+    """
+    限制速度，确保每个轮子的速度值不超过 max_speed, 且保证运动学解算结果准确
+    """
+    max_current_speed = max(abs(v1), abs(v2), abs(v3), abs(v4))  # 计算当前速度的最大绝对值
+
+    if max_current_speed > max_speed:
+        scale = max_speed / max_current_speed  # 计算缩放因子
+        v1 *= scale
+        v2 *= scale
+        v3 *= scale
+        v4 *= scale
+
+    return v1, v2, v3, v4
+
+
+if __name__ == "__main__":
+    # 逆解再正解应回到原来的运动量: python -m modules.kinematics
+    for model in (DEFAULT, Kinematics(OMNI, 0.03, 0.2, 0.2), Kinematics(MECANUM, 0.04, 0.25, 0.2)):
+        wheels = model.inverse(0.3, -0.2, 0.5)
+        back = model.forward(*wheels)
+        print(model.wheel, model.radius, [round(v, 3) for v in wheels], [round(v, 3) for v in back])
@@ -1,53 +1,70 @@
-from modules.motor import Motor
+import modules.kinematics as kinematics
+from modules.pid_motor_controller import Motors, Encoders
+from modules.shaper import CommandShaper
+from modules.wheel_speed import WheelSpeedController, MAX_COUNTS
 
 class RobotChassis():
-    def __init__(self, pins):
+    def __init__(self, pins, encoder_pins=None, model=None, shaper=None, max_counts=MAX_COUNTS, heading_hold=None, field_centric=None):
         """
         初始化机器人控制器，并设置电机的引脚。
         
         参数:
         pins (list): 包含四个电机的8个引脚列表，顺序为左前、左后、右前、右后。
+        encoder_pins (list): 四个编码器的8个引脚列表, 顺序同 Encoders。
+                             给出时使用闭环速度控制, 否则直接开环输出 PWM。
+        model (Kinematics): 底盘运动学模型, 默认 kinematics.DEFAULT。
+                            运动指令和编码器里程计共用这一个模型。
+        shaper (CommandShaper): set_command() 使用的指令整形器, 默认按 10ms 周期创建。
+        max_counts (float): 100% PWM 时每个采样周期的编码器脉冲数, 闭环前馈使用。
+        heading_hold (HeadingHold): 航向保持, 旋转指令回中时修正 v_w, None 表示不使用。
+        field_centric (FieldCentric): 场地坐标系转换, 启用时平移指令相对航向零点, None 表示不使用。
         
         示例:
         controller = RobotController([0, 1, 2, 3, 4, 5, 6, 7])
         """
-        # 检查引脚列表的长度是否为4
-        if len(pins) != 8:
-            raise ValueError("Expected 8 pin values for 4 motors.")
+        self.model = model if model is not None else kinematics.DEFAULT
+        self.motors = Motors(pins)  # 检查引脚数量并初始化四个电机
         
-        self.motor_lf = Motor(pins[0], pins[1])  # 左前
-        self.motor_rf = Motor(pins[2], pins[3])  # 左后
-        self.motor_rb = Motor(pins[4], pins[5])  # 右前
-        self.motor_lb = Motor(pins[6], pins[7])  # 右后
+        self.motor_lf = self.motors.motor_lf  # 左前
+        self.motor_rf = self.motors.motor_rf  # 左后
+        self.motor_rb = self.motors.motor_rb  # 右前
+        self.motor_lb = self.motors.motor_lb  # 右后
+
+        self.shaper = shaper if shaper is not None else CommandShaper()
+        self.heading_hold = heading_hold
+        self.field_centric = field_centric
+
+        self.encoders = None
+        self.speed_controller = None
+        if encoder_pins is not None:
+            self.encoders = Encoders(encoder_pins, model=self.model)
+            self.speed_controller = WheelSpeedController(self.motors, self.encoders, max_counts, model=self.model)
+            self.speed_controller.start()
     
     def scale_speed(self, v1, v2, v3, v4):
         """
         限制速度，确保每个输入电机的速度值不超过100%, 且保证运动学解算结果准确
         """
-        max_speed = 100  # 检查是否有速度超过最大值
-        
-        if abs(v1) > max_speed or abs(v2) > max_speed or abs(v3) > max_speed or abs(v4) > max_speed:
-            
-            max_current_speed = max(abs(v1), abs(v2), abs(v3), abs(v4))  # 计算当前速度的最大绝对值
-            scale = max_speed / max_current_speed  # 计算缩放因子
-            v1 *= scale  
-            v2 *= scale
-            v3 *= scale
-            v4 *= scale
-            
-        return v1, v2, v3, v4  # 返回处理后的速度值
+        return kinematics.normalize(v1, v2, v3, v4)  # 返回处理后的速度值
 
     def move(self, v_x, v_y, v_w): 
         """ 输入期望运动状态, 输出电机所需的运动速度 """
 
+        if self.field_centric is not None:  # 场地坐标系: 平移指令按航向转到车身坐标系
+            v_x, v_y = self.field_centric.rotate(v_x, v_y)
+
+        if self.heading_hold is not None:  # 旋转指令回中时由航向闭环修正
+            v_w = self.heading_hold.update(v_w, v_x != 0 or v_y != 0)
+
+        if self.speed_controller is not None:  # 闭环: 只更新目标速度, 由定时器执行 PID
+            self.speed_controller.set_velocity(v_x, v_y, v_w)
+            return
+
         # 运动学解算 
-        v_lf = v_x + v_y - v_w  # 左前
-        v_rf = v_x - v_y + v_w  # 右前
-        v_rb = -v_x - v_y - v_w  # 右后
-        v_lb = -v_x + v_y + v_w  # 左后
+        v_lf, v_rf, v_rb, v_lb = self.model.inverse(v_x, v_y, v_w)
 
         # 缩放速度, 保证运动学解算准确
-        v_lf, v_rf, v_lb, v_rb = self.scale_speed(v_lf, v_rf, v_lb, v_rb)
+        v_lf, v_rf, v_rb, v_lb = self.scale_speed(v_lf, v_rf, v_rb, v_lb)
 
         # 设置电机速度
         self.motor_lf.set_speed(v_lf)
@@ -55,6 +72,19 @@ class RobotChassis():
         self.motor_lb.set_speed(v_lb)
         self.motor_rb.set_speed(v_rb)
 
+    def set_command(self, v_x, v_y, v_w):
+        """ 设置期望运动, 经过加速度/加加速度限制后由 update() 输出 """
+        self.shaper.set_target(v_x, v_y, v_w)
+
+    def emergency_stop(self):
+        """ 按急停减速度停车, 停稳前忽略 set_command """
+        self.shaper.emergency_stop()
+
+    def update(self):
+        """ 每个控制周期调用: 按实测间隔整形一步并输出到电机 """
+        v = self.shaper.update()
+        self.move(v[0], v[1], v[2])
+
     # 封装一些简单运动的控制方法
     def go_forward(self, rate):
         self.move(rate, 0, 0)
@@ -74,8 +104,17 @@ class RobotChassis():
     def turn_right(self, rate):
         self.move(0, 0, -rate)
 
-    def stop(self):
-        self.move(0, 0, 0)
+    def stop(self, brake=False):
+        """
+        停车, 空闲时每个循环都会调用, 电机占空比没变化时不会重复写寄存器
+        @param brake: True 时刹车(电机短路), 否则滑行; 闭环时由 PID 把速度控制到 0
+        """
+        if self.speed_controller is not None:
+            self.speed_controller.set_velocity(0, 0, 0)
+        elif brake:
+            self.motors.brake()
+        else:
+            self.motors.coast()
 
     # 预留直接电机控制的方法
     def motor_lf_test(self, rate):
@@ -1,44 +1,140 @@
 
+from array import array
+
 from machine import Pin, PWM  # type: ignore
 
-from modules.utils import limit_value, map_value
+DUTY_MAX = 1023      # duty() 的满量程
+DUTY_U16_MAX = 65535  # duty_u16() 的满量程
 
 
 class Motor:
-    def __init__(self, forward_pin:int, backward_pin:int, PWM_LIMIT:tuple=(0, 1023)):
+    def __init__(self, forward_pin:int, backward_pin:int, PWM_LIMIT:tuple=(0, 1023), freq:int=500, u16=None):
         """
         初始化电机对象
         @param speed_pin: 电机速度控制引脚
         @param dir_pin: 电机方向控制引脚
-        @param PWM_LIMIT: PWM输出的上下限，默认为(0, 1023)
+        @param PWM_LIMIT: PWM输出的上下限，默认为(0, 1023), 单位与 duty() 相同
+        @param freq: PWM 频率
+        @param u16: 是否用 duty_u16() 输出 16 位占空比, None 时固件支持就使用
         """
         # 初始化电机控制对象
         self.PWM_LIMIT = PWM_LIMIT
-        self.fw_speed = PWM(Pin(forward_pin), freq=500, duty=0)   # 速度控制引脚
-        self.bk_speed = PWM(Pin(backward_pin), freq=500, duty=0)   # 速度控制引脚
-
+        self.fw_speed = PWM(Pin(forward_pin), freq=freq, duty=0)   # 速度控制引脚
+        self.bk_speed = PWM(Pin(backward_pin), freq=freq, duty=0)   # 速度控制引脚
+
+        if u16 is None:
+            u16 = hasattr(self.fw_speed, "duty_u16")
+        self.u16 = u16
+        if u16:
+            self._fw_duty = self.fw_speed.duty_u16
+            self._bk_duty = self.bk_speed.duty_u16
+            self.duty_max = DUTY_U16_MAX
+        else:
+            self._fw_duty = self.fw_speed.duty
+            self._bk_duty = self.bk_speed.duty
+            self.duty_max = DUTY_MAX
+
+        # 预先算好百分比到占空比的换算: duty = offset + |rate| * scale
+        unit = self.duty_max / DUTY_MAX
+        self._offset = PWM_LIMIT[0] * unit
+        self._scale = (PWM_LIMIT[1] - PWM_LIMIT[0]) * unit / 100
+
+        # 上一次写入的占空比, 值没有变化时不再写寄存器
+        self._fw_last = 0
+        self._bk_last = 0
+
+        self._dir = 0         # 上一次的转向, 1 / -1 / 0
+        self._kick_left = 0   # 起步补偿剩余次数
+        self._supply = 1.0    # 电池电压补偿系数, 由 BatteryMonitor 设置
+        self._derate = 1.0    # 堵转降额系数, 由 StallDetector 设置
+        self._output = 1.0    # 两个系数的乘积, 输出时只乘一次
+        self.rate = 0         # 最近一次的速度指令, 堵转检测使用
+        self.set_compensation()
+
+    def set_supply_scale(self, scale):
+        """ 设置电池电压补偿系数, 占空比乘以该系数, 0 表示停止输出 """
+        self._supply = scale
+        self._output = self._supply * self._derate
+
+    def set_derate(self, scale):
+        """ 设置降额系数, 1 为正常, 0 为切断输出 """
+        self._derate = scale
+        self._output = self._supply * self._derate
+
+    def set_compensation(self, deadband=0.0, kick=0.0, kick_ticks=0):
+        """
+        设置死区和静摩擦补偿, 预先算成查找表: 指令百分比 -> 占空比
+        @param deadband: 死区, PWM 百分比, 指令从 0 起跳到死区, 剩余范围线性分布
+        @param kick: 起步(从停止或反向)时的最小 PWM 百分比, 用于克服静摩擦
+        @param kick_ticks: 起步补偿保持的 set_speed 调用次数(控制周期数)
+        """
+        self.deadband = deadband
+        # 多一项, 插值时 rate=100 不越界
+        self._lut = array('H', [0] * 102)
+        for command in range(101):
+            pwm = deadband + command * (100 - deadband) / 100
+            self._lut[command] = int(self._offset + pwm * self._scale)
+        self._lut[101] = self._lut[100]
+        self._kick = int(self._offset + kick * self._scale) if kick > 0 else 0
+        self._kick_ticks = kick_ticks
+
+    def _duty(self, rate, direction):
+        """ 查表并插值得到占空比, rate 为正数 """
+        if rate > 100:
+            rate = 100
+        i = int(rate)
+        lut = self._lut
+        duty = lut[i] + int((lut[i + 1] - lut[i]) * (rate - i))
+
+        if direction != self._dir:
+            self._dir = direction
+            self._kick_left = self._kick_ticks
+        if self._kick_left > 0:
+            self._kick_left -= 1
+            if duty < self._kick:
+                duty = self._kick
+
+        if self._output != 1.0:
+            duty = int(duty * self._output)
+            if duty > self.duty_max:
+                duty = self.duty_max
+        return duty
+
+    def _write(self, fw, bk):
+        """ 只写入有变化的引脚 """
+        if fw != self._fw_last:
+            self._fw_duty(fw)
+            self._fw_last = fw
+        if bk != self._bk_last:
+            self._bk_duty(bk)
+            self._bk_last = bk
 
     def set_speed(self, rate):
         """
-        设置电机的速度
-        @param rate: 速度百分比，范围[-100, 100]
+        设置电机的速度, 0 时两个引脚都输出低电平(滑行)
+        @param rate: 速度百分比，范围[-100, 100], 经过死区和起步补偿后输出
         """
-        pwm_value = int(map_value(abs(rate), (0, 100), self.PWM_LIMIT))
-        pwm_value = limit_value(pwm_value, *self.PWM_LIMIT)  # 限制值
-
-        # print(f"rate:{rate} pwm_value:{pwm_value}")
-
+        self.rate = rate
         if rate > 0:
-            self.fw_speed.duty(pwm_value) 
-            self.bk_speed.duty(0)
+            self._write(self._duty(rate, 1), 0)
 
         elif rate < 0:
-            self.fw_speed.duty(0)         
-            self.bk_speed.duty(pwm_value)  
+            self._write(0, self._duty(-rate, -1))
 
         else:
-            self.fw_speed.duty(0)  
-            self.bk_speed.duty(0) 
+            self.coast()
+
+    def coast(self):
+        """ 滑行停车: 两个引脚都输出低电平, 电机断开, 靠摩擦停下 """
+        self.rate = 0
+        self._dir = 0
+        self._write(0, 0)
+
+    def brake(self):
+        """ 刹车停车: 两个引脚都输出高电平, 电机短路, 快速停下 """
+        self.rate = 0
+        self._dir = 0
+        self._write(self.duty_max, self.duty_max)
 
 
 if __name__ == "__main__":
@@ -8,6 +8,7 @@ import espnow
 import network
 from machine import Pin
 
+import modules.params as params
 from modules.utils import map_value
 
 
@@ -25,7 +26,6 @@ now.add_peer(b"\xff\xff\xff\xff\xff\xff")
 led = Pin(15, Pin.OUT, value=1)
 
 
-DEAD_AREA = 20  # 摇杆死区
 MAP_COEFF = 58  # 摇杆映射系数 (根据实际需求调整)
 
 OFFSET_lx = 16  # 摇杆校准偏移值
@@ -33,6 +33,8 @@ OFFSET_ly = 35
 OFFSET_rx = 6
 OFFSET_ry = 16
 
+KEEP = []  # 只收到参数修改时 read_espnow 返回的数据(为空, 不会被当成手柄数据), 主循环保持上一帧的指令
+
 
 def read_espnow():
     """读取espnow数据并进行解包处理"""
@@ -40,10 +42,17 @@ def read_espnow():
 
     #print("espnow数据:", msg)
 
-    if msg:  # 如果没有数据，则返回
-        
-        msg_str = msg.decode('utf-8')  # msg 解码为字符串
-        data = json.loads(msg_str)     # 处理接收到的数据
+    got_param = False
+    while msg:
+        data = json.loads(msg.decode('utf-8'))  # msg 解码为字符串并解析
+        if not isinstance(data, dict):
+            break
+        # 手柄菜单发来的参数修改, 应用后继续读下一帧手柄数据
+        print(f"参数修改: {data}, 成功: {params.apply(data)}")
+        got_param = True
+        host, msg = now.recv(0)
+
+    if msg:
 
         data[1] += OFFSET_lx   # lx 摇杆校准
         data[2] += OFFSET_ly   # ly 摇杆校准
@@ -53,7 +62,8 @@ def read_espnow():
         # print(f"矫正后数据: lx={data[1]}, ly={data[2]}, rx={data[3]}, ry={data[4]}")
 
         # 检查任意摇杆是否在活动状态
-        stick_work = any(abs(value - 127) > DEAD_AREA for value in data[1:5])  
+        dead_area = params.get("dead_area")  # 摇杆死区
+        stick_work = any(abs(value - 127) > dead_area for value in data[1:5])  
 
         if stick_work or data[5] != 0x8 or data[6] != 0x0:  # 如果任意摇杆或按键在活动状态，则闪烁led
             led.value(not led.value())  # 闪烁led
@@ -62,12 +72,25 @@ def read_espnow():
 
         return data, stick_work
     
+    elif got_param:  # 只有参数修改, 不能当作摇杆回中
+        return KEEP, False
+
     else:  # 如果没有数据，则返回
         return None, False
 
-def process_data(data):
-    
-    data, stick_work = read_espnow()
+def send_event(event):
+    """ 广播小车事件(堵转等), JSON 字典 """
+    try:
+        now.send(b"\xff\xff\xff\xff\xff\xff", json.dumps(event), False)
+    except OSError:
+        pass
+
+def process_data(packet=None):
+    """
+    摇杆数据映射到 -127 ~ 127
+    @param packet: read_espnow() 的返回值, None 时在这里读取
+    """
+    data, stick_work = packet if packet is not None else read_espnow()
 
     if data:
         
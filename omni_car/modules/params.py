@@ -0,0 +1,45 @@
+# 可在线调整的参数表, 由手柄菜单通过 espnow 修改
+# 参数名与手柄端 main.py 的菜单一致
+
+PARAMS = {
+    "scale_x": 0.8,   # 摇杆到速度的缩放系数
+    "scale_y": 0.8,
+    "scale_w": 0.4,
+    "dead_area": 20,  # 摇杆死区
+    "kp": 0.3,        # 轮速 PID
+    "ki": 0.0,
+    "kd": 0.02,
+    "accel": 400,     # 指令整形: 最大加速度, 单位/秒
+    "jerk": 4000,     # 指令整形: 最大加加速度, 单位/秒², 0 表示不限制
+}
+
+_listeners = []
+
+
+def get(name):
+    return PARAMS[name]
+
+
+def on_change(callback):
+    """ 注册参数变化回调 callback(name, value) """
+    _listeners.append(callback)
+
+
+def set_param(name, value):
+    """ 修改参数, 按默认值的类型转换, 未知参数返回 False """
+    if name not in PARAMS:
+        return False
+
+    value = type(PARAMS[name])(value)
+    PARAMS[name] = value
+    for callback in _listeners:
+        callback(name, value)
+    return True
+
+
+def apply(msg):
+    """ 处理手柄发来的参数消息 {"P": 参数名, "V": 值} """
+    try:
+        return set_param(msg["P"], msg["V"])
+    except (KeyError, TypeError, ValueError):
+        return False
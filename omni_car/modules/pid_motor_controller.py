@@ -1,59 +1,125 @@
 # 
+from array import array
+
+import machine
+import micropython
 from machine import Timer
 
-from modules.encoder import Encoder
+import modules.config as config
+import modules.kinematics as kinematics
+
+from modules.encoder import IRQ, make_encoder
 from modules.motor import Motor
 from modules.pid import PID
 
 class Encoders:
-    def __init__(self, pins:list, period:float=0.01):
-        self.encoder_lf = Encoder(pins[0], pins[1], dt=period)
-        self.encoder_rf = Encoder(pins[2], pins[3], dt=period)
-        self.encoder_rb = Encoder(pins[4], pins[5], dt=period)
-        self.encoder_lb = Encoder(pins[6], pins[7], dt=period)
+    def __init__(self, pins:list, period:float=0.01, model=None, pose=None, backend=None):
+        """
+        四个编码器, 定时器每个周期更新速度和里程计
+        @param period: 速度更新周期, 单位: 秒
+        @param model: kinematics.Kinematics, 与 RobotChassis 共用, 默认 kinematics.DEFAULT
+        @param pose: modules.pose.Pose, 每个周期积分世界坐标系位姿, None 表示不使用
+        @param backend: 编码器后端, 见 modules.encoder, None 时取 config.json 的 "encoder", 默认引脚中断
+        """
+        self.model = model if model is not None else kinematics.DEFAULT
+        if backend is None:
+            backend = config.get("encoder", IRQ)
+        self.backend = backend
+        self.encoder_lf = make_encoder(backend, pins[0], pins[1], dt=period, unit=0)
+        self.encoder_rf = make_encoder(backend, pins[2], pins[3], dt=period, unit=1)
+        self.encoder_rb = make_encoder(backend, pins[4], pins[5], dt=period, unit=2)
+        self.encoder_lb = make_encoder(backend, pins[6], pins[7], dt=period, unit=3)
+
+        self.encoders = (self.encoder_lf, self.encoder_rf, self.encoder_rb, self.encoder_lb)
 
         self.pos = [0, 0, 0, 0]
         self.speed = [0, 0, 0, 0]  # 单位: 脉冲/采样周期
-        self.odometry = [0, 0, 0]  # 前进速度, 侧向速度, 角速度
+        self.odometry = [0, 0, 0]  # 前进, 侧向, 旋转 的累计量, 车身坐标系, 世界坐标系位姿见 pose
+        self._increment = array('f', [0.0] * 3)
+        self.pose = pose
+        self.callback = None  # 每个周期更新完成后调用 callback(self), 用于数据采集
+
+        # 定时器中断只把四个计数值复制到 _raw, 其余计算通过 schedule 在主线程里完成
+        self._raw = array('l', [0] * 4)
+        self._prev = array('l', [encoder.poll() for encoder in self.encoders])
+        self._delta = array('l', [0] * 4)
+        self._periods = 0        # 上次处理之后经过的定时器周期数
+        self._pending = False
+        self.overruns = 0        # 上一周期还没处理完又到了下一周期的次数
+        self._update_ref = self.update_speed  # 预先绑定, 中断里不分配内存
 
         self.period = period  # 设置速度更新周期
         
         tim = Timer(1)
-        tim.init(period=int(self.period*1000), mode=Timer.PERIODIC,callback=self.update_speed)  # 每个周期 计算一次速度
-
-
-    def update_speed(self, timer_callback):
-        # 计算速度
-        self.encoder_lf.update_speed()
-        self.encoder_rf.update_speed()
-        self.encoder_rb.update_speed()
-        self.encoder_lb.update_speed()
-        
-        self.speed[0] = self.encoder_lf.speed
-        self.speed[1] = self.encoder_rf.speed
-        self.speed[2] = self.encoder_rb.speed
-        self.speed[3] = self.encoder_lb.speed
-
-
-        self.pos[0] = self.encoder_lf.position()
-        self.pos[1] = self.encoder_rf.position()
-        self.pos[2] = self.encoder_rb.position()
-        self.pos[3] = self.encoder_lb.position()
-        # print(f"pos: {self.pos}, rate: {self.speed}")
-
-        # 计算速度对应的里程计增量
-        odom_increment = self.odometer(*self.speed)
+        tim.init(period=int(self.period*1000), mode=Timer.PERIODIC,callback=self._tick)  # 每个周期 采样一次计数
+
+
+    def _tick(self, timer):
+        """ 定时器中断: 复制计数并调度 update_speed, 不做浮点运算也不分配内存 """
+        raw = self._raw
+        encoders = self.encoders
+        raw[0] = encoders[0].poll()
+        raw[1] = encoders[1].poll()
+        raw[2] = encoders[2].poll()
+        raw[3] = encoders[3].poll()
+        self._periods += 1
+
+        if self._pending:  # 上一次还没执行, 这次的计数由它一起处理
+            self.overruns += 1
+            return
+        self._pending = True
+        try:
+            micropython.schedule(self._update_ref, None)
+        except RuntimeError:  # 调度队列满, 下一周期再处理
+            self._pending = False
+            self.overruns += 1
+
+    def update_speed(self, *args):
+        """ 由 _tick 调度, 在主线程里计算速度、里程计和位姿 """
+        raw = self._raw
+        prev = self._prev
+        delta = self._delta
+        # 先取计数再清标志, 之后到来的中断会重新调度
+        irq_state = machine.disable_irq()
+        for i in range(4):
+            delta[i] = raw[i] - prev[i]
+            prev[i] = raw[i]
+        periods = self._periods
+        self._periods = 0
+        self._pending = False
+        machine.enable_irq(irq_state)
+
+        if periods == 0:
+            return
+
+        encoders = self.encoders
+        for i in range(4):
+            self.pos[i] = prev[i]
+            # 错过周期时取平均, 保持 脉冲/采样周期 的单位
+            speed = delta[i] if periods == 1 else int(delta[i] / periods)
+            self.speed[i] = speed
+            # 单个编码器的 speed 与这里保持一致, 相当于替它调用了 update_speed()
+            encoder = encoders[i]
+            encoder.speed = speed
+            encoder._prev_pos = prev[i]
+
+        # 里程计用整段位移, 错过的周期不会丢
+        odom_increment = self.model.forward_into(delta, self._increment)
 
         # 逐个元素累加
         self.odometry[0] += odom_increment[0]
         self.odometry[1] += odom_increment[1]
         self.odometry[2] += odom_increment[2]
 
+        if self.pose is not None:
+            self.pose.update(delta, periods)
+
+        if self.callback is not None:
+            self.callback(self)
+
     def odometer(self, v_lf, v_rf, v_rb, v_lb) -> list: 
-        v_x = (v_lf + v_rf - v_rb - v_lb) / 2.0
-        v_y = (v_lf - v_rf + v_rb - v_lb) / 2.0
-        v_w = (-v_lf + v_rf + v_rb - v_lb) / 2.0
-        return v_x, v_y, v_w
+        """ 轮速 -> 运动量, 使用与逆解相同的运动学模型 """
+        return self.model.forward(v_lf, v_rf, v_rb, v_lb)
 
     
     def get_odometry(self) -> list:
@@ -75,12 +141,52 @@ class Motors:
         self.motor_rf = Motor(pins[2], pins[3])  # 左后
         self.motor_rb = Motor(pins[4], pins[5])  # 右前
         self.motor_lb = Motor(pins[6], pins[7])  # 右后
+        self.motors = (self.motor_lf, self.motor_rf, self.motor_rb, self.motor_lb)
 
     def set_speed(self, speed:list):
-        self.motor_lf.set_speed(speed)
-        self.motor_rf.set_speed(speed)
-        self.motor_rb.set_speed(speed)
-        self.motor_lb.set_speed(speed)    
+        """ 按 左前, 右前, 右后, 左后 的顺序设置四个电机 """
+        self.motor_lf.set_speed(speed[0])
+        self.motor_rf.set_speed(speed[1])
+        self.motor_rb.set_speed(speed[2])
+        self.motor_lb.set_speed(speed[3])    
+
+    def calibrate(self, motors:list):
+        """
+        按标定结果设置四个电机的死区和起步补偿
+        @param motors: config.json 的 motors 列表, 顺序为 左前, 右前, 右后, 左后,
+                       每项包含 deadband, 可选 kick 和 kick_ticks
+        """
+        for motor, cal in zip((self.motor_lf, self.motor_rf, self.motor_rb, self.motor_lb), motors):
+            motor.set_compensation(cal.get("deadband", 0.0), cal.get("kick", 0.0), cal.get("kick_ticks", 0))
+
+    def get_rate(self, i):
+        """ 第 i 个电机最近一次的速度指令 """
+        return self.motors[i].rate
+
+    def set_derate(self, i, scale):
+        """ 第 i 个电机的降额系数, 1 为正常, 0 为切断 """
+        self.motors[i].set_derate(scale)
+
+    def set_supply_scale(self, scale):
+        """ 电池电压补偿系数, 由 BatteryMonitor 推送 """
+        self.motor_lf.set_supply_scale(scale)
+        self.motor_rf.set_supply_scale(scale)
+        self.motor_rb.set_supply_scale(scale)
+        self.motor_lb.set_supply_scale(scale)
+
+    def coast(self):
+        """ 四个电机滑行停车 """
+        self.motor_lf.coast()
+        self.motor_rf.coast()
+        self.motor_rb.coast()
+        self.motor_lb.coast()
+
+    def brake(self):
+        """ 四个电机刹车 """
+        self.motor_lf.brake()
+        self.motor_rf.brake()
+        self.motor_rb.brake()
+        self.motor_lb.brake()
     
     # 预留直接电机控制的方法
     def set_speed_lf(self, speed):
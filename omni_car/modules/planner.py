@@ -0,0 +1,199 @@
+from array import array
+import math
+import time
+
+from modules.wheel_speed import MAX_COUNTS
+
+TRAPEZOID = "trapezoid"
+SCURVE = "scurve"
+
+_TWO_PI = 2 * math.pi
+_ticks_us = getattr(time, "ticks_us", None)  # 电脑上没有, 按固定周期计算
+
+
+class Planner:
+    def __init__(self, drive, odometer, v_max=(1600, 1600, 1600), a_max=(4000, 4000, 4000),
+                 kp=(4.0, 4.0, 4.0), ff_gain=None, profile=TRAPEZOID, period=0.01,
+                 tolerance=(20, 20, 20), settle=0.5):
+        """
+        相对运动规划: move_by(dx, dy, dθ) 加入队列, 每个控制周期调用 tick(), 不阻塞
+        距离单位与 odometer.odometry 相同(默认运动学模型下为编码器脉冲数)
+        三个轴共用一条归一化速度曲线, 同时出发同时到达, 总时间在速度和加速度限制下最短
+        注意 odometry 是车身坐标系下的累计量, 平移和旋转同时进行时只是近似, 建议分成两段
+        @param drive: 有 move(v_x, v_y, v_w) 方法的对象, 例如 RobotChassis
+        @param odometer: 有 odometry 列表的对象, 例如 Encoders
+        @param v_max: 三个轴的最大速度, 单位/秒
+        @param a_max: 三个轴的最大加速度, 单位/秒²
+        @param kp: 位置误差反馈增益, 1/秒
+        @param ff_gain: 速度(单位/秒)到 move() 指令的换算, None 时按 MAX_COUNTS 计算
+        @param profile: TRAPEZOID 梯形速度曲线, SCURVE 加速段为正弦曲线, 加速度连续
+        @param period: tick() 的标称调用周期, 单位: 秒, 曲线按实测间隔推进, 电脑上和每段的第一拍用这个值
+        @param tolerance: 三个轴的到位误差
+        @param settle: 曲线结束后等待到位的最长时间, 单位: 秒
+        """
+        self.drive = drive
+        self.odometer = odometer
+        self.v_max = v_max
+        self.a_max = a_max
+        self.kp = kp
+        self.ff_gain = ff_gain if ff_gain is not None else 100 * period / MAX_COUNTS
+        self.profile = profile
+        self.period = period
+        self.tolerance = tolerance
+        self.settle = settle
+
+        self.queue = []  # 待执行的 (dx, dy, dθ)
+        self.active = False
+
+        self._distance = array('f', [0.0] * 3)  # 当前段三个轴的位移
+        self._start = array('f', [0.0] * 3)     # 当前段开始时的里程计
+        self._command = array('f', [0.0] * 3)
+        self._t = 0.0
+        self._last_us = None
+        # 归一化曲线 s(t) 从 0 到 1 的参数
+        self._ramp = 0.0   # 加速时间
+        self._cruise = 0.0  # 匀速时间
+        self._peak = 0.0   # 最大速度
+
+    def move_by(self, dx, dy, dtheta):
+        """ 加入一段相对运动 """
+        self.queue.append((dx, dy, dtheta))
+
+    def follow(self, waypoints):
+        """ 加入一串相对运动 """
+        for point in waypoints:
+            self.move_by(*point)
+
+    def cancel(self):
+        """ 清空队列并停车 """
+        del self.queue[:]
+        self.active = False
+        self.drive.move(0, 0, 0)
+
+    @property
+    def busy(self):
+        return self.active or bool(self.queue)
+
+    def _begin(self, segment):
+        """ 开始新的一段, 计算归一化速度曲线 """
+        odometry = self.odometer.odometry
+        speed = accel = math.inf
+        for i in range(3):
+            d = abs(segment[i])
+            self._distance[i] = segment[i]
+            self._start[i] = odometry[i]
+            if d > 0:
+                speed = min(speed, self.v_max[i] / d)
+                accel = min(accel, self.a_max[i] / d)
+
+        self._t = 0.0
+        self._last_us = None
+        self.active = True
+        if speed == math.inf:  # 零位移
+            self._ramp = self._cruise = self._peak = 0.0
+            return
+
+        if self.profile == SCURVE:
+            accel /= 2  # 正弦加速段的峰值加速度是平均值的两倍
+
+        if speed * speed / accel > 1:  # 达不到最大速度, 三角形曲线
+            speed = math.sqrt(accel)
+        self._peak = speed
+        self._ramp = speed / accel
+        self._cruise = (1 - speed * self._ramp) / speed
+
+    def _ramp_state(self, t):
+        """ 加速段从 0 开始经过 t 秒的 (位置, 速度) """
+        vp = self._peak
+        ta = self._ramp
+        if self.profile == SCURVE:
+            phase = _TWO_PI * t / ta
+            s = vp * (t * t / (2 * ta) + ta * (math.cos(phase) - 1) / (_TWO_PI * _TWO_PI))
+            v = vp * (t / ta - math.sin(phase) / _TWO_PI)
+        else:
+            s = vp * t * t / (2 * ta)
+            v = vp * t / ta
+        return s, v
+
+    def _sample(self, t):
+        """ 归一化曲线在 t 时刻的 (位置, 速度) """
+        ta = self._ramp
+        tc = self._cruise
+        total = 2 * ta + tc
+        if t >= total:
+            return 1.0, 0.0
+        if t < ta:
+            return self._ramp_state(t)
+        if t < ta + tc:
+            return self._peak * (ta / 2 + t - ta), self._peak
+        s, v = self._ramp_state(total - t)
+        return 1.0 - s, v
+
+    def _elapsed(self):
+        """ 距上次 tick() 的实际时间, 主循环周期受 espnow 和打印影响, 按次数累加会让曲线变慢 """
+        if _ticks_us is None:
+            return self.period
+        now = _ticks_us()
+        last = self._last_us
+        self._last_us = now
+        if last is None:
+            return self.period
+        dt = time.ticks_diff(now, last) / 1_000_000
+        if dt <= 0:
+            return self.period
+        return dt if dt < 5 * self.period else 5 * self.period  # 主循环卡顿时不会一步跳过整段曲线
+
+    def tick(self):
+        """ 每个控制周期调用一次, 返回是否还有运动没有完成 """
+        if not self.active:
+            if not self.queue:
+                return False
+            self._begin(self.queue.pop(0))
+
+        self._t += self._elapsed()
+        s, ds = self._sample(self._t)
+        odometry = self.odometer.odometry
+
+        done = self._t >= 2 * self._ramp + self._cruise
+        command = self._command
+        for i in range(3):
+            d = self._distance[i]
+            error = d * s - (odometry[i] - self._start[i])
+            if done and abs(error) > self.tolerance[i]:
+                done = False
+            command[i] = (d * ds + self.kp[i] * error) * self.ff_gain  # 前馈 + 位置反馈
+
+        if done or self._t >= 2 * self._ramp + self._cruise + self.settle:
+            self.active = False
+            self.drive.move(0, 0, 0)
+            return bool(self.queue)
+
+        self.drive.move(command[0], command[1], command[2])
+        return True
+
+
+if __name__ == "__main__":
+    # 在电脑上用仿真电机测试: python -m modules.planner
+    from modules.sim_plant import make_sim
+    from modules.wheel_speed import WheelSpeedController
+
+    motors, encoders = make_sim()
+    controller = WheelSpeedController(motors, encoders, kp=1.0, ki=20.0, kd=0.0)
+
+    class Drive:
+        def move(self, v_x, v_y, v_w):
+            controller.set_velocity(v_x, v_y, v_w)
+
+    for profile in (TRAPEZOID, SCURVE):
+        planner = Planner(Drive(), encoders, profile=profile)
+        planner.follow([(4000, 0, 0), (0, -2000, 0), (0, 0, 3000)])
+
+        start = list(encoders.odometry)
+        steps = 0
+        while planner.tick():
+            encoders.step()
+            controller.update()
+            steps += 1
+
+        moved = [round(encoders.odometry[i] - start[i]) for i in range(3)]
+        print(f"{profile}: {steps * planner.period:.2f} s, 位移 {moved}")
@@ -0,0 +1,142 @@
+# 航位推算: 编码器轮速 -> 车身速度 -> 世界坐标系位姿 (x, y, θ)
+# 世界坐标系以 reset() 时的车身为准: x 前进为正, y 向右为正, θ 逆时针为正(弧度)
+# 结果放在预分配的 array 里, 定时器回调里更新不分配内存
+
+from array import array
+import math
+
+import modules.kinematics as kinematics
+from modules.imu import DEG2RAD, wrap180
+
+# 示例值, 需要标定(见 calibrate()):
+# 直线走 1 米, 运动学正解的前进量累计多少; 原地转 1 弧度, 旋转量累计多少
+COUNTS_PER_METER = 5000.0
+COUNTS_PER_RADIAN = 700.0
+
+
+class Pose:
+    def __init__(self, model=None, counts_per_meter=COUNTS_PER_METER, counts_per_radian=COUNTS_PER_RADIAN,
+                 imu=None, period=0.01):
+        """
+        @param model: kinematics.Kinematics, 与 Encoders 共用, 默认 kinematics.DEFAULT
+        @param counts_per_meter: 正解平移量(x, y) 到 米 的换算
+        @param counts_per_radian: 正解旋转量 到 弧度 的换算
+        @param imu: 有 yaw(度) 属性的对象, 给出时 θ 使用 IMU 偏航角, 不用轮子的旋转量
+        @param period: update() 的调用周期, 单位: 秒, 用于计算速度
+        """
+        self.model = model if model is not None else kinematics.DEFAULT
+        self.counts_per_meter = counts_per_meter
+        self.counts_per_radian = counts_per_radian
+        self.imu = imu
+        self.period = period
+
+        self.pose = array('f', [0.0] * 3)      # 世界坐标系 x(米), y(米), θ(弧度)
+        self.velocity = array('f', [0.0] * 3)  # 车身坐标系 前进(米/秒), 侧向(米/秒), 旋转(弧度/秒)
+        self.counts = array('f', [0.0] * 3)    # 车身坐标系正解量的累计, 用于标定
+        self._body = array('f', [0.0] * 3)
+        self._seq = 0   # 写入时为奇数, 见 snapshot()
+        self._yaw = 0.0  # 上一次的 IMU 偏航角, 度
+        self.reset()
+
+    def reset(self, x=0.0, y=0.0, theta=0.0):
+        """ 设置当前位姿, 并清零标定累计量 """
+        self._seq += 1
+        self.pose[0] = x
+        self.pose[1] = y
+        self.pose[2] = theta
+        for i in range(3):
+            self.counts[i] = 0.0
+            self.velocity[i] = 0.0
+        if self.imu is not None:
+            self._yaw = self.imu.yaw
+        self._seq += 1
+
+    def update(self, counts, periods=1):
+        """
+        积分一段位移, 在编码器更新速度之后调用
+        @param counts: 四个轮子这段时间的脉冲数, 左前, 右前, 右后, 左后
+        @param periods: 这段时间包含的采样周期数, 编码器错过周期时大于 1
+        """
+        body = self.model.forward_into(counts, self._body)
+        total = self.counts
+        total[0] += body[0]
+        total[1] += body[1]
+        total[2] += body[2]
+
+        dx = body[0] / self.counts_per_meter
+        dy = body[1] / self.counts_per_meter
+        if self.imu is not None:
+            yaw = self.imu.yaw
+            dtheta = wrap180(yaw - self._yaw) * DEG2RAD  # 用原始偏航角, 不受 IMU.zero() 影响
+            self._yaw = yaw
+        else:
+            dtheta = body[2] / self.counts_per_radian
+
+        self._seq += 1
+        pose = self.pose
+        # 用这段时间中点的朝向把车身位移转到世界坐标系
+        theta = pose[2] + dtheta * 0.5
+        c = math.cos(theta)
+        s = math.sin(theta)
+        pose[0] += c * dx + s * dy
+        pose[1] += c * dy - s * dx
+        theta = pose[2] + dtheta
+        if theta > math.pi:
+            theta -= 2 * math.pi
+        elif theta <= -math.pi:
+            theta += 2 * math.pi
+        pose[2] = theta
+
+        dt = self.period * periods
+        velocity = self.velocity
+        velocity[0] = dx / dt
+        velocity[1] = dy / dt
+        velocity[2] = dtheta / dt
+        self._seq += 1
+
+    def snapshot(self, out=None):
+        """
+        主循环读取位姿: 复制到 out 里返回, 保证 x, y, θ 来自同一个周期
+        定时器回调可能在复制过程中执行, 序号变化时重新复制
+        @param out: 长度为 3 的 array 或 list, None 时新建
+        """
+        if out is None:
+            out = array('f', [0.0] * 3)
+        pose = self.pose
+        while True:
+            seq = self._seq
+            out[0] = pose[0]
+            out[1] = pose[1]
+            out[2] = pose[2]
+            if seq == self._seq and not seq & 1:
+                return out
+
+    def calibrate(self, distance=None, angle=None):
+        """
+        用 reset() 之后的累计量标定换算系数
+        @param distance: 刚才直线前进的实际距离, 单位: 米
+        @param angle: 刚才原地旋转的实际角度, 单位: 弧度(逆时针为正)
+        """
+        if distance:
+            self.counts_per_meter = self.counts[0] / distance
+        if angle:
+            self.counts_per_radian = self.counts[2] / angle
+        return {"counts_per_meter": self.counts_per_meter, "counts_per_radian": self.counts_per_radian}
+
+
+if __name__ == "__main__":
+    # 在电脑上测试: 前进 1 米, 左转 90 度, 再前进 1 米, 应在 (1, -1) 附近. python -m modules.pose
+    pose = Pose()
+    model = pose.model
+    wheels = array('f', [0.0] * 4)
+
+    def drive(v_x, v_w, ticks):
+        model.inverse_into((v_x, 0.0, v_w), wheels)
+        for _ in range(ticks):
+            pose.update(wheels)
+
+    drive(COUNTS_PER_METER / 100, 0, 100)
+    drive(0, COUNTS_PER_RADIAN * math.pi / 2 / 100, 100)
+    drive(COUNTS_PER_METER / 100, 0, 100)
+    x, y, theta = pose.snapshot()
+    print(f"x={x:.3f} m  y={y:.3f} m  θ={theta / DEG2RAD:.1f}°")
@@ -0,0 +1,158 @@
+from array import array
+import math
+import time
+
+_ticks_us = getattr(time, "ticks_us", None)  # 电脑上没有, 按固定周期计算
+
+
+class CommandShaper:
+    def __init__(self, accel=(400, 400, 600), jerk=(4000, 4000, 6000), estop=(1500, 1500, 2000), period=0.01,
+                 max_dt=0.05):
+        """
+        运动指令整形: 限制 (x, y, w) 三个轴的加速度和加加速度, 避免摇杆猛推时电流冲击和打滑
+        单位与 RobotChassis.move 相同, 加速度为 单位/秒, 加加速度为 单位/秒²
+        @param accel: 三个轴的最大加速度
+        @param jerk: 三个轴的最大加加速度, 0 表示不限制
+        @param estop: 急停时三个轴的减速度, 急停不限制加加速度
+        @param period: 调用 update() 的名义周期, 单位: 秒, 第一次调用和电脑上运行时使用
+        @param max_dt: 实测周期的上限, 主循环卡顿后不会一步跳太多
+        """
+        self.period = period
+        self.max_dt = max_dt
+        self._last_us = None
+        self.accel = array('f', accel)
+        self.jerk = array('f', jerk)
+        self.estop = array('f', estop)
+
+        self.target = array('f', [0.0] * 3)  # 目标指令
+        self.value = array('f', [0.0] * 3)   # 整形后的指令
+        self.rate = array('f', [0.0] * 3)    # 当前加速度
+        self.emergency = False
+
+    def set_limits(self, accel=None, jerk=None, estop=None):
+        """ 运行时修改限制, 单个数值表示三个轴相同 """
+        for values, dest in ((accel, self.accel), (jerk, self.jerk), (estop, self.estop)):
+            if values is None:
+                continue
+            for i in range(3):
+                dest[i] = values if isinstance(values, (int, float)) else values[i]
+
+    def set_target(self, v_x, v_y, v_w):
+        """ 设置目标指令, 急停过程中忽略, 直到停稳 """
+        if self.emergency:
+            return
+        self.target[0] = v_x
+        self.target[1] = v_y
+        self.target[2] = v_w
+
+    def emergency_stop(self):
+        """ 以急停减速度减到 0, 停稳前不接受新的目标 """
+        self.emergency = True
+        for i in range(3):
+            self.target[i] = 0.0
+            self.rate[i] = 0.0
+
+    def reset(self):
+        """ 立即清零, 不经过整形 """
+        self.emergency = False
+        self._last_us = None
+        for i in range(3):
+            self.target[i] = 0.0
+            self.value[i] = 0.0
+            self.rate[i] = 0.0
+
+    def _elapsed(self):
+        """ 距上次 update() 的实际时间, 主循环周期受 espnow 和打印影响, 不等于 period """
+        if _ticks_us is None:
+            return self.period
+        now = _ticks_us()
+        last = self._last_us
+        self._last_us = now
+        if last is None:
+            return self.period
+        dt = time.ticks_diff(now, last) / 1_000_000
+        if dt <= 0:
+            return self.period
+        return dt if dt < self.max_dt else self.max_dt
+
+    def update(self, dt=None):
+        """
+        每个控制周期调用一次, 返回整形后的 (x, y, w), 每次复用同一个 array
+        @param dt: 距上次调用的时间, 单位: 秒, None 时实测
+        """
+        if dt is None:
+            dt = self._elapsed()
+        value = self.value
+        rate = self.rate
+
+        if self.emergency:
+            moving = False
+            for i in range(3):
+                step = self.estop[i] * dt
+                v = value[i]
+                if v > step:
+                    value[i] = v - step
+                    moving = True
+                elif v < -step:
+                    value[i] = v + step
+                    moving = True
+                else:
+                    value[i] = 0.0
+            self.emergency = moving
+            return value
+
+        for i in range(3):
+            error = self.target[i] - value[i]
+            a_max = self.accel[i]
+            j_max = self.jerk[i]
+
+            if j_max <= 0:  # 只限加速度
+                step = a_max * dt
+                if error > step:
+                    error = step
+                elif error < -step:
+                    error = -step
+                value[i] += error
+                continue
+
+            # 期望加速度: 保证加速度能及时降到 0 而不超调, a² = 2·j·Δv
+            desired = math.sqrt(2 * j_max * abs(error))
+            if desired > a_max:
+                desired = a_max
+            if error < 0:
+                desired = -desired
+
+            # 加速度按加加速度限制逐步变化
+            a = rate[i]
+            step = j_max * dt
+            if desired > a + step:
+                a += step
+            elif desired < a - step:
+                a -= step
+            else:
+                a = desired
+
+            delta = a * dt
+            if (error > 0 and delta >= error) or (error < 0 and delta <= error) or error == 0:
+                value[i] = self.target[i]  # 到达目标
+                a = 0.0
+            else:
+                value[i] += delta
+            rate[i] = a
+
+        return value
+
+
+if __name__ == "__main__":
+    # 打印阶跃输入的整形结果: python -m modules.shaper
+    shaper = CommandShaper()
+    shaper.set_target(100, 0, 0)
+    for n in range(40):
+        v = shaper.update()
+        if n % 4 == 0:
+            print(f"{n * 10:4d} ms  x={v[0]:6.1f}  a={shaper.rate[0]:6.1f}")
+
+    shaper.emergency_stop()
+    for n in range(10):
+        v = shaper.update()
+    print(f"急停 100 ms 后 x={v[0]:.1f}, 急停中: {shaper.emergency}")
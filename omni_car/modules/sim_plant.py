@@ -0,0 +1,144 @@
+# 电机和编码器的仿真模型, 接口与 Motors / Encoders 一致
+# 不依赖 machine, 可以在电脑上运行, 用于调试闭环控制
+
+from array import array
+
+import modules.kinematics as kinematics
+
+
+class MotorPlant:
+    def __init__(self, gain=40.0, tau=0.08, deadband=12.0, period=0.01):
+        """
+        一阶直流电机模型
+        @param gain: 100% PWM 时的稳态速度, 单位: 脉冲/采样周期
+        @param tau: 时间常数, 单位: 秒
+        @param deadband: 死区, 低于该 PWM 百分比电机不转
+        @param period: 采样周期, 单位: 秒
+        """
+        self.gain = gain
+        self.tau = tau
+        self.deadband = deadband
+        self.period = period
+        self.supply = 1.0  # 电池电压比例, 模拟电压下降
+        self.load = 0.0    # 负载, 以 PWM 百分比表示
+
+        self.rate = 0.0    # 输入 PWM 百分比
+        self.speed = 0.0   # 实际速度, 脉冲/周期 (浮点)
+        self.pos = 0.0
+
+    def step(self):
+        """ 前进一个采样周期, 返回这个周期内的脉冲数 """
+        drive = abs(self.rate) * self.supply - self.load
+        if drive <= self.deadband:
+            drive = 0.0
+        else:
+            drive = (drive - self.deadband) / (100 - self.deadband) * 100
+        target = self.gain * drive / 100 * (1 if self.rate >= 0 else -1)
+
+        self.speed += (target - self.speed) * min(self.period / self.tau, 1.0)
+        last = int(self.pos)
+        self.pos += self.speed
+        return int(self.pos) - last
+
+
+class SimMotors:
+    def __init__(self, plants):
+        """ 仿真电机组, 接口同 pid_motor_controller.Motors """
+        self.plants = plants  # 左前, 右前, 右后, 左后
+        self.deadband = [0.0, 0.0, 0.0, 0.0]
+        self.supply_scale = 1.0
+        self.rates = [0, 0, 0, 0]          # 最近一次的速度指令
+        self.derate = [1.0, 1.0, 1.0, 1.0]
+
+    def calibrate(self, motors):
+        """ 同 Motors.calibrate, 只模拟死区补偿 """
+        for i, cal in enumerate(motors):
+            self.deadband[i] = cal.get("deadband", 0.0)
+
+    def set_supply_scale(self, scale):
+        """ 同 Motors.set_supply_scale """
+        self.supply_scale = scale
+
+    def get_rate(self, i):
+        return self.rates[i]
+
+    def set_derate(self, i, scale):
+        self.derate[i] = scale
+        self._set(i, self.rates[i])
+
+    def _set(self, i, rate):
+        self.rates[i] = rate
+        if rate != 0:
+            deadband = self.deadband[i]
+            rate = min(max(rate, -100), 100)
+            rate = (deadband + abs(rate) * (100 - deadband) / 100) * (1 if rate > 0 else -1)
+            rate = min(max(rate * self.supply_scale * self.derate[i], -100), 100)
+        self.plants[i].rate = rate
+
+    def set_speed(self, speed):
+        for i in range(4):
+            self._set(i, speed[i])
+
+    def coast(self):
+        self.set_speed((0, 0, 0, 0))
+
+    def brake(self):
+        self.set_speed((0, 0, 0, 0))  # 仿真不区分刹车和滑行
+
+    def set_speed_lf(self, speed):
+        self._set(0, speed)
+
+    def set_speed_rf(self, speed):
+        self._set(1, speed)
+
+    def set_speed_rb(self, speed):
+        self._set(2, speed)
+
+    def set_speed_lb(self, speed):
+        self._set(3, speed)
+
+
+class SimEncoders:
+    def __init__(self, plants, model=None, pose=None):
+        """ 仿真编码器组, 接口同 pid_motor_controller.Encoders, 需要手动调用 step() """
+        self.plants = plants
+        self.period = plants[0].period
+        self.model = model if model is not None else kinematics.DEFAULT
+        self.pos = [0, 0, 0, 0]
+        self.speed = [0, 0, 0, 0]  # 单位: 脉冲/采样周期
+        self.odometry = [0, 0, 0]  # 前进, 侧向, 旋转 的累计量
+        self._increment = array('f', [0.0] * 3)
+        self.pose = pose
+        self.callback = None
+
+    def step(self):
+        """ 所有电机前进一个采样周期, 相当于定时器回调 """
+        for i, plant in enumerate(self.plants):
+            counts = plant.step()
+            self.speed[i] = counts
+            self.pos[i] += counts
+
+        increment = self.model.forward_into(self.speed, self._increment)
+        for i in range(3):
+            self.odometry[i] += increment[i]
+
+        if self.pose is not None:
+            self.pose.update(self.speed)
+
+        if self.callback is not None:
+            self.callback(self)
+
+    def get_odometry(self):
+        return self.odometry
+
+    def get_speed(self):
+        return self.speed
+
+    def get_pos(self):
+        return self.pos
+
+
+def make_sim(period=0.01, **kwargs):
+    """ 创建一组四轮仿真: 返回 (SimMotors, SimEncoders) """
+    plants = [MotorPlant(period=period, **kwargs) for _ in range(4)]
+    return SimMotors(plants), SimEncoders(plants)
@@ -0,0 +1,156 @@
+# 堵转检测: 比较每个轮子的 PWM 指令和编码器实测速度(可选电流采样),
+# 持续堵转时先降额, 仍然堵转则切断, 松开指令后恢复. 每个控制周期每个轮子 O(1)
+
+from array import array
+import time
+
+from modules.wheel_speed import MAX_COUNTS
+
+NORMAL = 0
+DERATED = 1
+CUT = 2
+
+WHEELS = ("lf", "rf", "rb", "lb")
+
+_ticks_us = getattr(time, "ticks_us", None)  # 电脑上没有, 按固定周期计算
+
+
+class StallDetector:
+    def __init__(self, motors, encoders, max_counts=MAX_COUNTS, min_pwm=30, speed_ratio=0.2,
+                 window=0.3, derate=0.4, current=None, current_limit=1_500_000, period=0.01, controller=None):
+        """
+        @param motors: 电机组, 需要 get_rate(i) 和 set_derate(i, scale)
+        @param encoders: 编码器组, speed 为四个轮子的 脉冲/采样周期
+        @param max_counts: 100% PWM 时的 脉冲/周期, 用于计算期望速度
+        @param min_pwm: 指令低于这个 PWM 百分比时不检测
+        @param speed_ratio: 实测速度低于期望速度的这个比例视为堵转
+        @param window: 持续堵转多长时间触发, 单位: 秒
+        @param derate: 第一次触发后的降额系数, 再次触发时切断
+        @param current: 四个电流采样 ADC(有 read_uv()), None 表示不使用
+        @param current_limit: 电流采样电压上限, 单位: 微伏, 超过也视为堵转
+        @param period: update() 的名义调用周期, 单位: 秒, 第一次调用和电脑上使用, 小车上按实测间隔计时
+        @param controller: 闭环时的 WheelSpeedController, 松开判断用它的目标速度, 降额/切断时清空该轮积分
+        """
+        self.motors = motors
+        self.encoders = encoders
+        self.max_counts = max_counts
+        self.min_pwm = min_pwm
+        self.speed_ratio = speed_ratio
+        self.window = round(window * 1_000_000)  # 微秒
+        self.period = round(period * 1_000_000)
+        self._last_us = None
+        self.derate = derate
+        self.current = current
+        self.current_limit = current_limit
+        self.controller = controller
+
+        self.counts = array('l', [0] * 4)  # 每个轮子连续堵转的时间, 微秒
+        self.state = array('B', [NORMAL] * 4)
+        self.events = 0                      # 触发次数
+        self._callbacks = []
+
+    def on_event(self, callback):
+        """ 注册事件回调 callback(wheel, state), wheel 为 WHEELS 里的名字 """
+        self._callbacks.append(callback)
+
+    def _report(self, i, state):
+        if self.controller is not None:
+            self.controller.pid.reset(i)  # 输出被降额/切断时积分会一直累积, 恢复时会冲出去
+        self.state[i] = state
+        self.events += 1
+        for callback in self._callbacks:
+            callback(WHEELS[i], state)
+
+    def _elapsed(self):
+        """ 距上次 update() 的时间, 微秒; 主循环周期不固定, 按次数计时会把窗口拉长 """
+        if _ticks_us is None:
+            return self.period
+        now = _ticks_us()
+        last = self._last_us
+        self._last_us = now
+        if last is None:
+            return self.period
+        dt = time.ticks_diff(now, last)
+        if dt <= 0:
+            return self.period
+        return dt if dt < 5 * self.period else 5 * self.period  # 主循环卡顿时不会一次就触发
+
+    def update(self, *args):
+        """ 每个控制周期调用一次 """
+        dt = self._elapsed()
+        motors = self.motors
+        speed = self.encoders.speed
+        scale = self.max_counts * self.speed_ratio / 100
+        controller = self.controller
+        if controller is not None:
+            target = controller.target
+            target_scale = 100 / controller.max_counts
+
+        for i in range(4):
+            rate = motors.get_rate(i)
+            if rate < 0:
+                rate = -rate
+            state = self.state[i]
+
+            # 是否松开按操作者的指令判断: 闭环时电机 PWM 含积分, 被卡住时不会降下来
+            if controller is not None:
+                command = target[i] * target_scale
+                if command < 0:
+                    command = -command
+            else:
+                command = rate
+
+            if command < self.min_pwm:
+                # 松开指令: 清零计数并恢复输出
+                self.counts[i] = 0
+                if state != NORMAL:
+                    motors.set_derate(i, 1.0)
+                    self._report(i, NORMAL)
+                continue
+
+            if state == CUT:
+                if controller is not None:
+                    controller.pid.reset(i)  # 切断期间不累积积分
+                continue
+
+            drive = rate * (self.derate if state == DERATED else 1.0)
+            measured = speed[i] if speed[i] >= 0 else -speed[i]
+            stalled = measured < drive * scale
+            if self.current is not None and self.current[i].read_uv() > self.current_limit:
+                stalled = True
+
+            if not stalled:
+                self.counts[i] = 0
+                continue
+
+            self.counts[i] += dt
+            if self.counts[i] >= self.window:
+                self.counts[i] = 0
+                if state == NORMAL:
+                    motors.set_derate(i, self.derate)
+                    self._report(i, DERATED)
+                else:
+                    motors.set_derate(i, 0.0)
+                    self._report(i, CUT)
+
+
+if __name__ == "__main__":
+    # 在电脑上用仿真电机测试: python -m modules.stall
+    from modules.sim_plant import make_sim
+
+    motors, encoders = make_sim()
+    detector = StallDetector(motors, encoders)
+    tick = 0
+    detector.on_event(lambda wheel, state: print(f"{tick * 10:5d} ms  {wheel}: {('恢复', '降额', '切断')[state]}"))
+
+    motors.set_speed((80, 80, 80, 80))
+    for tick in range(200):
+        if tick == 50:
+            motors.plants[1].load = 100  # 右前轮被卡住
+        encoders.step()
+        detector.update()
+
+    motors.set_speed((0, 0, 0, 0))  # 松开摇杆
+    motors.plants[1].load = 0
+    encoders.step()
+    detector.update()
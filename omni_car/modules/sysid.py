@@ -0,0 +1,131 @@
+# 电机模型辨识: 依次给每个轮子加 PWM 阶跃, 按编码器采样周期记录脉冲数
+# 数据保存为二进制文件, 由电脑端 tools/sysid_fit.py 拟合死区, 增益和时间常数
+
+from array import array
+import struct
+import time
+
+MAGIC = b"SYID"
+HEADER = "<4sBBHI"  # 标识, 版本, 每个采样的字段数, 采样周期 us, 采样数
+VERSION = 1
+FIELDS = 6  # 轮子序号, PWM 百分比, 左前, 右前, 右后, 左后 的脉冲数
+
+DUMP_PATH = "/sysid.bin"
+
+
+class StepCapture:
+    def __init__(self, motors, encoders, levels=(10, 20, 30, 40, 60, 80, 100), hold=50, rest=50, controller=None):
+        """
+        阶跃响应采集, 由编码器定时器驱动, 每个采样周期记录一次并切换 PWM
+        @param motors: 电机组, 需要 set_speed_lf/rf/rb/lb
+        @param encoders: 编码器组, 每个周期调用 callback(encoders)
+        @param levels: 阶跃的 PWM 百分比
+        @param hold: 每个阶跃保持的采样数
+        @param rest: 每个阶跃之后停转的采样数
+        @param controller: 正在运行的 WheelSpeedController, 采集期间暂停它的定时器, 否则它会覆盖 PWM
+        """
+        self.motors = motors
+        self.encoders = encoders
+        self.levels = levels
+        self.hold = hold
+        self.rest = rest
+        self.controller = controller
+        self._paused = False
+        self._setters = (motors.set_speed_lf, motors.set_speed_rf,
+                         motors.set_speed_rb, motors.set_speed_lb)
+
+        self.per_wheel = len(levels) * (hold + rest)
+        self.total = 4 * self.per_wheel
+        self.buffer = array('h', bytes(2 * FIELDS * self.total))  # 预先分配, 采集时不分配内存
+        self.count = 0
+        self.running = False
+
+        self._wheel = 0
+        self._pwm = 0
+
+    def start(self):
+        self.count = 0
+        self._wheel = 0
+        self._pwm = 0
+        controller = self.controller
+        if controller is not None and controller._timer is not None:
+            controller.stop()
+            self._paused = True
+        self.running = True
+        self.encoders.callback = self.sample
+
+    def stop(self):
+        self.running = False
+        self.encoders.callback = None
+        for setter in self._setters:
+            setter(0)
+        if self._paused:  # 恢复速度闭环, 清空暂停前的积分
+            self._paused = False
+            self.controller.pid.reset()
+            self.controller.start()
+
+    def sample(self, encoders):
+        """ 编码器定时器回调: 记录上一个周期的 PWM 和脉冲数, 然后设置下一个周期的 PWM """
+        if not self.running:
+            return
+
+        n = self.count
+        if n >= self.total:
+            self.stop()
+            return
+
+        buf = self.buffer
+        base = n * FIELDS
+        speed = encoders.speed
+        buf[base] = self._wheel
+        buf[base + 1] = self._pwm
+        buf[base + 2] = speed[0]
+        buf[base + 3] = speed[1]
+        buf[base + 4] = speed[2]
+        buf[base + 5] = speed[3]
+        self.count = n + 1
+
+        if n + 1 >= self.total:
+            self.stop()
+            return
+
+        wheel = (n + 1) // self.per_wheel
+        k = (n + 1) % self.per_wheel
+        phase = k % (self.hold + self.rest)
+        pwm = self.levels[k // (self.hold + self.rest)] if phase < self.hold else 0
+
+        if wheel != self._wheel or pwm != self._pwm:
+            self._setters[wheel](pwm)
+        self._wheel = wheel
+        self._pwm = pwm
+
+    def dump(self, path=DUMP_PATH):
+        """ 写入二进制文件: 文件头 + 采样数据(小端 int16) """
+        period_us = int(self.encoders.period * 1_000_000)
+        with open(path, "wb") as f:
+            f.write(struct.pack(HEADER, MAGIC, VERSION, FIELDS, period_us, self.count))
+            f.write(memoryview(self.buffer)[:self.count * FIELDS])
+
+    def run(self, path=DUMP_PATH):
+        """ 在小车上执行: 阻塞直到采集完成并保存 """
+        self.start()
+        while self.running:
+            time.sleep_ms(100)
+        self.dump(path)
+        print(f"采集完成: {self.count} 个采样, 已保存到 {path}")
+
+
+if __name__ == "__main__":
+    # 在电脑上用仿真电机测试: python -m modules.sysid /tmp/sysid.bin
+    import sys
+    from modules.sim_plant import make_sim
+
+    motors, encoders = make_sim()
+    capture = StepCapture(motors, encoders)
+    capture.start()
+    while capture.running:
+        encoders.step()
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "sysid.bin"
+    capture.dump(path)
+    print(f"采集完成: {capture.count} 个采样, 已保存到 {path}")
@@ -0,0 +1,150 @@
+from array import array
+
+import modules.kinematics as kinematics
+from modules.pid import MultiPID
+
+
+MAX_COUNTS = 40  # 100% PWM 时每个采样周期的编码器脉冲数, 需要实测标定
+
+
+class WheelSpeedController:
+    def __init__(self, motors, encoders, max_counts=MAX_COUNTS, kp=0.3, ki=0.0, kd=0.02, model=None):
+        """
+        四轮闭环速度控制
+        @param motors: 电机组, 需要 set_speed_lf/rf/rb/lb, 单位: PWM 百分比
+        @param encoders: 编码器组, speed 为四个轮子的 脉冲/采样周期
+        @param max_counts: 100% PWM 对应的 脉冲/采样周期, 用于前馈和单位换算
+        @param model: kinematics.Kinematics, 默认 kinematics.DEFAULT
+        """
+        self.model = model if model is not None else kinematics.DEFAULT
+        self.motors = motors
+        self.encoders = encoders
+        self.max_counts = max_counts
+        self.period = encoders.period if encoders is not None else 0.01
+
+        # 左前, 右前, 右后, 左后
+        self.pid = MultiPID(4, kp, ki, kd, dt=self.period, output_limits=(-100, 100))
+        self.target = self.pid.setpoint     # 目标速度, 脉冲/采样周期
+        self.output = [0.0, 0.0, 0.0, 0.0]  # 输出 PWM 百分比
+        self._vel = array('f', [0.0] * 3)
+        # 速度前馈: 目标 脉冲/周期 -> PWM 百分比, 每个轮子一个系数
+        self.feedforward = array('f', [100 / max_counts] * 4)
+        self._wheels = array('f', [0.0] * 4)
+        self._bias = array('f', [0.0] * 4)
+        self._setters = (motors.set_speed_lf, motors.set_speed_rf,
+                         motors.set_speed_rb, motors.set_speed_lb)
+
+        # 没有编码器时只能开环
+        self.closed_loop = encoders is not None
+        self._timer = None
+
+    def set_feedforward(self, gains):
+        """
+        按标定结果设置每个轮子的前馈, 电机已做死区补偿时转速与指令成正比
+        @param gains: 四个轮子 100% 指令时的 脉冲/周期, 见 config.json 的 motors[i]["gain"]
+                      不大于 0 时(电机没转或方向接反)保留按 max_counts 的默认前馈
+        """
+        for i in range(4):
+            gain = gains[i]
+            if gain is None or gain <= 0:
+                print(f"轮子 {i} 的标定增益 {gain} 无效, 使用默认前馈")
+                self.feedforward[i] = 100 / self.max_counts
+            else:
+                self.feedforward[i] = 100 / gain
+
+    def set_gains(self, kp=None, ki=None, kd=None):
+        """ 在线修改 PID 参数 """
+        self.pid.set_gains(kp, ki, kd)
+
+    def set_closed_loop(self, enable):
+        """ 切换闭环/开环, 切换时清空积分, 避免输出跳变 """
+        self.closed_loop = enable and self.encoders is not None
+        self.pid.reset()
+
+    def set_wheels(self, v_lf, v_rf, v_rb, v_lb):
+        """ 直接设置四个轮子的目标速度, 单位: PWM 百分比 [-100, 100] """
+        scale = self.max_counts / 100
+        self.target[0] = v_lf * scale
+        self.target[1] = v_rf * scale
+        self.target[2] = v_rb * scale
+        self.target[3] = v_lb * scale
+
+    def set_velocity(self, v_x, v_y, v_w):
+        """ 输入期望运动状态(与 RobotChassis.move 相同的单位), 换算为各轮目标脉冲速度 """
+        vel = self._vel
+        vel[0] = v_x
+        vel[1] = v_y
+        vel[2] = v_w
+        wheels = kinematics.normalize_into(self.model.inverse_into(vel, self._wheels))
+        self.set_wheels(wheels[0], wheels[1], wheels[2], wheels[3])
+
+    def update(self, *args):
+        """ 每个采样周期调用一次: 目标速度前馈 + PID 修正 """
+        feedforward = self.feedforward
+        bias = self._bias
+        for i in range(4):
+            bias[i] = self.target[i] * feedforward[i]  # 前馈
+
+        if self.closed_loop:
+            # 前馈作为 bias 传入, PID 按最终输出限幅和抗饱和, 前馈已饱和时积分不会继续累积
+            output = self.pid.update(self.encoders.speed, bias=bias)  # 四个轮子一次更新
+        else:
+            output = bias
+
+        for i in range(4):
+            u = min(max(output[i], -100), 100)
+            self.output[i] = u
+            self._setters[i](u)
+
+    def start(self, timer_id=2):
+        """ 用硬件定时器按固定周期调用 update, 回调通过 schedule 在主线程执行 """
+        import micropython
+        from machine import Timer
+
+        def tick(timer):
+            try:
+                micropython.schedule(self.update, None)
+            except RuntimeError:  # 调度队列满, 说明上一次还没执行完, 跳过这一拍
+                pass
+
+        self._timer = Timer(timer_id)
+        self._timer.init(period=int(self.period * 1000), mode=Timer.PERIODIC, callback=tick)
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+        for setter in self._setters:
+            setter(0)
+
+
+if __name__ == "__main__":
+    # 在电脑上用仿真电机测试: python -m modules.wheel_speed
+    from modules.sim_plant import make_sim
+
+    motors, encoders = make_sim()
+    controller = WheelSpeedController(motors, encoders, kp=1.0, ki=20.0, kd=0.0)
+
+    for battery in (1.0, 0.8):  # 模拟电池电压下降
+        for plant in motors.plants:
+            plant.supply = battery
+
+        controller.set_velocity(50, 0, 0)
+        for i in range(100):
+            encoders.step()
+            controller.update()
+
+        print(f"电池 {battery:.0%}: 目标 {controller.target}, 实际 {encoders.speed}, PWM {[round(o, 1) for o in controller.output]}")
+
+    # 加上死区补偿和按标定增益的前馈后, 开环也能基本跟上目标
+    motors.calibrate([{"deadband": 12.0}] * 4)
+    controller.set_feedforward([40.0] * 4)
+    controller.set_closed_loop(False)
+    for plant in motors.plants:
+        plant.supply = 1.0
+    for speed in (5, 20, 50):
+        controller.set_velocity(speed, 0, 0)
+        for i in range(100):
+            encoders.step()
+            controller.update()
+        print(f"补偿后开环 {speed}%: 目标 {list(controller.target)}, 实际 {encoders.speed}")
@@ -0,0 +1,11 @@
+# 电脑上运行的 pytest 测试, 在 omni_car 目录下执行: python -m pytest -q test
+# 这个目录里的其他脚本需要在小车上运行(依赖 machine), 不参与收集
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+collect_ignore = ["test_SensorFusion.py"]
@@ -0,0 +1,110 @@
+# 继电反馈自整定: 测得的 Ku/Tu 与描述函数法对仿真电机的理论值比较
+
+import cmath
+import math
+
+import pytest
+
+from modules.autotune import RelayTuner, TL_PI, gains
+from modules.sim_plant import make_sim
+
+GAIN = 400.0  # 脉冲数取整对振幅的影响要小, 用较高的编码器分辨率
+TAU = 0.08
+DEADBAND = 12.0
+PERIOD = 0.01
+AMPLITUDE = 20
+HYSTERESIS = 3
+
+
+def predicted():
+    """
+    离散一阶模型 L(z) = g / (z - a) 与带回差继电的交点:
+    Im L = -π·ε / (4·d), 此时 Ku = -1 / Re L, Tu = 2π / ω · 周期
+    """
+    a = 1 - PERIOD / TAU
+    g = (1 - a) * GAIN / (100 - DEADBAND)
+    target = -math.pi * HYSTERESIS / (4 * AMPLITUDE)
+
+    def loop(w):
+        return g / (cmath.exp(1j * w) - a)
+
+    # 从 π 往低频找 Im L 第一次到达 target 的频率, 再二分
+    high = math.pi
+    low = high
+    while loop(low).imag > target:
+        low -= 0.01
+    for _ in range(60):
+        mid = (low + high) / 2
+        if loop(mid).imag > target:
+            high = mid
+        else:
+            low = mid
+    w = (low + high) / 2
+    return -1 / loop(w).real, 2 * math.pi / w * PERIOD
+
+
+def tune():
+    motors, encoders = make_sim(gain=GAIN, tau=TAU, deadband=DEADBAND, period=PERIOD)
+    tuner = RelayTuner(motors, encoders, max_counts=GAIN, amplitude=AMPLITUDE, hysteresis=HYSTERESIS)
+    tuner.start()
+    steps = 0
+    while tuner.running:
+        encoders.step()
+        steps += 1
+    return tuner, steps * PERIOD
+
+
+def test_ku_tu_match_describing_function():
+    ku, tu = predicted()
+    tuner, _ = tune()
+    for result in tuner.results:
+        assert result is not None
+        assert result[0] == pytest.approx(ku, rel=0.10)
+        assert result[1] == pytest.approx(tu, rel=0.20)  # 周期只能是整数个采样
+
+
+def test_finishes_in_seconds_per_wheel():
+    _, elapsed = tune()
+    assert elapsed < 4 * 1.5
+
+
+def test_gains_rules():
+    kp, ki, kd = gains(3.2, 0.1, TL_PI)
+    assert kp == pytest.approx(1.0)
+    assert ki == pytest.approx(1.0 / 0.22)
+    assert kd == 0.0
+    with pytest.raises(ValueError):
+        gains(1.0, 1.0, "unknown")
+
+
+class FakeController:
+    """ 只记录启停的速度闭环 """
+
+    def __init__(self):
+        self._timer = object()
+        self.starts = 0
+        self.resets = 0
+        self.pid = self
+
+    def reset(self):
+        self.resets += 1
+
+    def start(self):
+        self._timer = object()
+        self.starts += 1
+
+    def stop(self):
+        self._timer = None
+
+
+def test_tuner_pauses_speed_controller():
+    motors, encoders = make_sim(gain=GAIN, tau=TAU, deadband=DEADBAND, period=PERIOD)
+    controller = FakeController()
+    tuner = RelayTuner(motors, encoders, max_counts=GAIN, amplitude=AMPLITUDE, hysteresis=HYSTERESIS,
+                       controller=controller)
+    tuner.start()
+    assert controller._timer is None
+    while tuner.running:
+        encoders.step()
+    assert controller._timer is not None
+    assert controller.starts == 1 and controller.resets == 1
@@ -0,0 +1,68 @@
+# PCNT 后端: 16 位硬件计数器在 ±limit 归零, 累计位置不能丢
+
+import pytest
+
+from modules.encoder import FAKE, PCNT_LIMIT, FakeCounter, PCNTEncoder, make_encoder
+
+
+def feed(encoder, pulses, times):
+    for _ in range(times):
+        encoder.counter.add(pulses)
+        encoder.update_speed()
+
+
+@pytest.mark.parametrize("direction", [1, -1])
+def test_wrap_both_directions(direction):
+    encoder = make_encoder(FAKE, 4, 6)
+    feed(encoder, 3000 * direction, 20)  # 60000 个脉冲, 计数器归零一次
+    assert encoder.position() == 60000 * direction
+    assert encoder.speed == 3000 * direction
+    assert abs(encoder.counter.value()) < PCNT_LIMIT
+
+
+def test_forward_then_back():
+    encoder = make_encoder(FAKE, 4, 6)
+    feed(encoder, 3000, 30)
+    feed(encoder, -3000, 50)
+    assert encoder.position() == -60000
+    assert encoder.speed == -3000
+
+
+def test_small_limit_many_wraps():
+    encoder = PCNTEncoder(0, 0, counter=FakeCounter(limit=100), limit=100)
+    feed(encoder, 37, 100)
+    assert encoder.value() == 3700
+    feed(encoder, -49, 200)
+    assert encoder.value() == 3700 - 9800
+
+
+def test_set_and_reset():
+    encoder = make_encoder(FAKE, 4, 6)
+    feed(encoder, 500, 3)
+    encoder.value(10)
+    feed(encoder, 5, 1)
+    assert encoder.value() == 15
+    encoder.reset()
+    assert encoder.value() == 0
+    encoder.scale = 0.5
+    assert encoder.position(100) == 100
+    assert encoder.value() == 200
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        make_encoder("spi", 4, 6)
+
+
+def test_main_context_reads_do_not_touch_counter():
+    # 只有采样周期里的 poll() 累加增量, 主线程读取和设置位置不会与它交错累加
+    encoder = make_encoder(FAKE, 4, 6)
+    encoder.counter.add(1000)
+    assert encoder.value() == 0
+    assert encoder.position() == 0
+    assert encoder.poll() == 1000
+    encoder.counter.add(200)
+    encoder.value(0)
+    assert encoder.poll() == 200
+    encoder.reset()
+    assert encoder.poll() == 0
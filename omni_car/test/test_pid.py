@@ -0,0 +1,30 @@
+# MultiPID 的参数修改和抗积分饱和
+
+import pytest
+
+from modules.pid import MultiPID
+
+
+def test_kt_follows_ki_when_not_given():
+    pid = MultiPID(1, kp=0.5, ki=0.0, kd=0.0)
+    assert pid.kt == 0.0
+    pid.set_gains(ki=10.0)  # 手柄菜单后调大 ki, 抗饱和要随之生效
+    assert pid.kt == pytest.approx(20.0)
+    assert pid._kt_dt == pytest.approx(0.2)
+    pid.set_gains(kp=2.0)
+    assert pid.kt == pytest.approx(5.0)
+
+
+def test_explicit_kt_is_kept():
+    pid = MultiPID(1, kp=1.0, ki=1.0, kd=0.0, kt=3.0)
+    pid.set_gains(ki=8.0)
+    assert pid.kt == 3.0
+
+
+def test_back_calculation_limits_integral():
+    pid = MultiPID(1, kp=0.5, ki=0.0, kd=0.0)
+    pid.set_gains(ki=10.0)
+    for _ in range(500):
+        pid.update([0.0], setpoint=[1000.0])  # 持续饱和
+    assert pid.output[0] == 100
+    assert pid.integral[0] < 100
@@ -0,0 +1,40 @@
+# 运动规划: 曲线按实测的调用间隔推进, 主循环变慢时总时间不变
+
+import pytest
+
+import modules.planner as planner
+from modules.planner import Planner
+
+
+class Ideal:
+    """ 理想底盘: 指令速度直接积分为里程计 """
+
+    def __init__(self):
+        self.odometry = [0.0, 0.0, 0.0]
+        self.command = (0, 0, 0)
+
+    def move(self, v_x, v_y, v_w):
+        self.command = (v_x, v_y, v_w)
+
+
+@pytest.mark.parametrize("interval_us", [10_000, 20_000])
+def test_profile_follows_measured_time(monkeypatch, interval_us):
+    now = [0]
+    monkeypatch.setattr(planner, "_ticks_us", lambda: now[0])
+    monkeypatch.setattr(planner.time, "ticks_diff", lambda a, b: a - b, raising=False)
+
+    robot = Ideal()
+    plan = Planner(robot, robot, v_max=(1600, 1600, 1600), a_max=(4000, 4000, 4000))
+    plan.move_by(4000, 0, 0)
+    dt = interval_us / 1_000_000
+    elapsed = 0.0
+    while plan.tick():
+        now[0] += interval_us
+        elapsed += dt
+        for i in range(3):
+            robot.odometry[i] += robot.command[i] / plan.ff_gain * dt
+
+    # 加速 0.4 秒 + 匀速 2.1 秒 + 减速 0.4 秒
+    assert elapsed == pytest.approx(2.9, abs=0.05)
+    assert robot.odometry[0] == pytest.approx(4000, abs=plan.tolerance[0])
+    assert robot.command == (0, 0, 0)
@@ -0,0 +1,78 @@
+# 堵转检测: 卡住 -> 降额 -> 切断, 松开摇杆后恢复
+
+import pytest
+
+from modules.sim_plant import make_sim
+from modules.stall import CUT, DERATED, NORMAL, StallDetector
+from modules.wheel_speed import WheelSpeedController
+
+
+def setup(closed_loop):
+    motors, encoders = make_sim()
+    controller = None
+    if closed_loop:
+        controller = WheelSpeedController(motors, encoders, kp=2.2, ki=31.9, kd=0.0)
+    detector = StallDetector(motors, encoders, controller=controller)
+    events = []
+    detector.on_event(lambda wheel, state: events.append((wheel, state)))
+    return motors, encoders, controller, detector, events
+
+
+def drive(motors, encoders, controller, detector, speed, steps):
+    if controller is not None:
+        controller.set_velocity(speed, 0, 0)
+    else:
+        motors.set_speed((speed, speed, speed, speed))
+    for _ in range(steps):
+        encoders.step()
+        if controller is not None:
+            controller.update()
+        detector.update()
+
+
+def test_window_is_time_based(monkeypatch):
+    import modules.stall as stall
+
+    now = [0]
+    monkeypatch.setattr(stall, "_ticks_us", lambda: now[0])
+    monkeypatch.setattr(stall.time, "ticks_diff", lambda a, b: a - b, raising=False)
+
+    motors, encoders = make_sim()
+    detector = StallDetector(motors, encoders, window=0.3)
+    events = []
+    detector.on_event(lambda wheel, state: events.append((wheel, state)))
+
+    # 主循环实际 20ms 一次: 按时间计, 0.3 秒(15 次)后降额, 而不是 30 次
+    motors.set_speed((80, 80, 80, 80))
+    motors.plants[1].load = 100
+    calls = 0
+    while not events:
+        now[0] += 20_000
+        encoders.step()
+        detector.update()
+        calls += 1
+    assert events == [("rf", DERATED)]
+    assert 15 <= calls <= 20  # 电机减速到判定阈值以下需要几个周期
+
+
+@pytest.mark.parametrize("closed_loop", [False, True])
+def test_cut_and_release(closed_loop):
+    motors, encoders, controller, detector, events = setup(closed_loop)
+
+    drive(motors, encoders, controller, detector, 80, 50)
+    assert events == []
+
+    motors.plants[1].load = 100  # 右前轮被卡住
+    drive(motors, encoders, controller, detector, 80, 150)
+    assert events == [("rf", DERATED), ("rf", CUT)]
+    assert detector.state[1] == CUT
+    assert list(detector.state[i] for i in (0, 2, 3)) == [NORMAL] * 3
+
+    # 松开摇杆后恢复, 闭环时该轮积分已清空, 不会在目标为 0 时继续转
+    motors.plants[1].load = 0
+    drive(motors, encoders, controller, detector, 0, 100)
+    assert events[-1] == ("rf", NORMAL)
+    assert detector.state[1] == NORMAL
+    assert encoders.speed[1] == 0
+    if controller is not None:
+        assert abs(controller.output[1]) < detector.min_pwm
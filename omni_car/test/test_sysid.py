@@ -0,0 +1,79 @@
+# 阶跃采集 -> 二进制文件 -> 电脑端拟合, 结果应接近仿真电机的参数
+
+import pytest
+
+np = pytest.importorskip("numpy")
+sysid_fit = pytest.importorskip("sysid_fit")
+
+from modules.sim_plant import make_sim
+from modules.sysid import StepCapture
+
+
+def capture(tmp_path, reversed_wheel=None):
+    """ 仿真采集并读回, reversed_wheel 的编码器方向接反 """
+    motors, encoders = make_sim(gain=40.0, tau=0.08, deadband=12.0)
+    if reversed_wheel is not None:
+        plant = motors.plants[reversed_wheel]
+        step = plant.step
+        plant.step = lambda: -step()
+    capture = StepCapture(motors, encoders)
+    capture.start()
+    while capture.running:
+        encoders.step()
+    assert capture.count == capture.total
+
+    path = tmp_path / "sysid.bin"
+    capture.dump(str(path))
+    return sysid_fit.load(str(path))
+
+
+def test_capture_and_fit(tmp_path):
+    period, data = capture(tmp_path)
+    assert period == pytest.approx(0.01)
+
+    for wheel in range(4):
+        fit = sysid_fit.fit_wheel(data, wheel, period)
+        assert fit["deadband"] == pytest.approx(12.0, abs=1.5)
+        assert fit["gain"] == pytest.approx(40.0, rel=0.05)
+        assert fit["tau"] == pytest.approx(0.08, rel=0.15)
+    sysid_fit.check_signs([sysid_fit.fit_wheel(data, wheel, period) for wheel in range(4)])
+
+
+def test_reversed_encoder_rejected(tmp_path):
+    period, data = capture(tmp_path, reversed_wheel=2)
+    motors = [sysid_fit.fit_wheel(data, wheel, period) for wheel in range(4)]
+    assert [m["sign"] for m in motors] == [1, 1, -1, 1]
+    with pytest.raises(ValueError, match="rb"):
+        sysid_fit.check_signs(motors)
+
+
+class FakeController:
+    """ 只记录启停的速度闭环 """
+
+    def __init__(self):
+        self._timer = object()
+        self.starts = 0
+        self.resets = 0
+        self.pid = self
+
+    def reset(self):
+        self.resets += 1
+
+    def start(self):
+        self._timer = object()
+        self.starts += 1
+
+    def stop(self):
+        self._timer = None
+
+
+def test_capture_pauses_speed_controller():
+    motors, encoders = make_sim()
+    controller = FakeController()
+    capture = StepCapture(motors, encoders, levels=(50,), hold=5, rest=5, controller=controller)
+    capture.start()
+    assert controller._timer is None
+    while capture.running:
+        encoders.step()
+    assert controller._timer is not None
+    assert controller.starts == 1 and controller.resets == 1
@@ -0,0 +1,53 @@
+# 闭环速度控制在仿真电机上的阶跃响应
+
+import pytest
+
+from modules.sim_plant import make_sim
+from modules.wheel_speed import WheelSpeedController
+
+
+def run(controller, encoders, steps):
+    for _ in range(steps):
+        encoders.step()
+        controller.update()
+
+
+@pytest.mark.parametrize("supply", [1.0, 0.8, 0.6])
+def test_step_response_settles(supply):
+    motors, encoders = make_sim()
+    for plant in motors.plants:
+        plant.supply = supply  # 电池电压下降, 只靠前馈达不到目标
+    controller = WheelSpeedController(motors, encoders, kp=1.0, ki=20.0, kd=0.0)
+
+    controller.set_velocity(50, 0, 0)
+    run(controller, encoders, 100)
+
+    # 1 秒内稳定, 之后 0.2 秒里每个周期误差不超过 1 个脉冲
+    for _ in range(20):
+        encoders.step()
+        controller.update()
+        for i in range(4):
+            assert abs(encoders.speed[i] - controller.target[i]) <= 1
+
+
+def test_stops_without_windup():
+    motors, encoders = make_sim()
+    controller = WheelSpeedController(motors, encoders, kp=1.0, ki=20.0, kd=0.0)
+
+    controller.set_velocity(100, 0, 0)  # 前馈已经到 100%, 积分不应继续累积
+    run(controller, encoders, 200)
+    assert all(abs(v) < 5 for v in controller.pid.integral)
+
+    controller.set_velocity(0, 0, 0)
+    run(controller, encoders, 100)
+    assert encoders.speed == [0, 0, 0, 0]
+
+
+def test_open_loop_fallback():
+    motors, encoders = make_sim()
+    controller = WheelSpeedController(motors, None)
+    assert not controller.closed_loop
+
+    controller.set_wheels(50, -50, 25, 0)
+    controller.update()
+    assert motors.rates == [50, -50, 25, 0]
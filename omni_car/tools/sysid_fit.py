@@ -0,0 +1,150 @@
+"""
+电机模型拟合: 读取 modules/sysid.py 采集的阶跃响应, 拟合每个轮子的
+死区, 增益和时间常数, 给出建议的轮速 PID 参数和前馈参数,
+写入小车开机时加载的配置文件(modules/config.py).
+
+在电脑上运行, 需要 NumPy:
+
+    mpremote cp :sysid.bin sysid.bin
+    python tools/sysid_fit.py sysid.bin config.json
+    mpremote cp config.json :config.json
+
+模型: 速度(脉冲/周期) 一阶响应, 稳态值 = a * (PWM - 死区)
+PID 按 IMC(λ 整定) 计算, λ = 时间常数 * --lambda-ratio
+"""
+
+import argparse
+import json
+import math
+import os
+import struct
+
+import numpy as np
+
+# 与 modules/sysid.py 保持一致
+MAGIC = b"SYID"
+HEADER = "<4sBBHI"
+FIELDS = 6
+
+WHEELS = ("lf", "rf", "rb", "lb")
+
+
+def load(path):
+    """ 返回 (采样周期 秒, 采样数据 N x FIELDS) """
+    with open(path, "rb") as f:
+        raw = f.read()
+    size = struct.calcsize(HEADER)
+    magic, version, fields, period_us, count = struct.unpack(HEADER, raw[:size])
+    if magic != MAGIC or fields != FIELDS:
+        raise ValueError(f"{path}: not a sysid capture")
+    data = np.frombuffer(raw, dtype="<i2", count=count * fields, offset=size)
+    return period_us / 1_000_000, data.reshape(count, fields).astype(float)
+
+
+def segments(data, wheel):
+    """ 某个轮子每个阶跃的 (PWM, 速度序列) """
+    rows = data[data[:, 0] == wheel]
+    pwm = rows[:, 1]
+    speed = rows[:, 2 + wheel]
+    edges = np.flatnonzero(np.diff(pwm) != 0) + 1
+    for chunk_pwm, chunk_speed in zip(np.split(pwm, edges), np.split(speed, edges)):
+        if chunk_pwm[0] > 0:
+            yield chunk_pwm[0], chunk_speed
+
+
+def steady_state(speed):
+    """ 阶跃后段的平均速度 """
+    return float(np.mean(speed[int(len(speed) * 0.6):]))
+
+
+def fit_wheel(data, wheel, period):
+    levels, steadies = [], []
+    num = den = 0.0
+    for pwm, speed in segments(data, wheel):
+        steady = steady_state(speed)
+        levels.append(pwm)
+        steadies.append(steady)
+
+        # 一阶响应 y[k+1] - y[k] = α * (稳态 - y[k]), 所有阶跃合在一起最小二乘求 α,
+        # 幅值大的阶跃权重大, 受脉冲数取整的影响小
+        if abs(steady) >= 0.5:
+            error = steady - speed[:-1]
+            num += float(np.dot(np.diff(speed), error))
+            den += float(np.dot(error, error))
+
+    levels = np.array(levels)
+    steadies = np.array(steadies)
+    sign = 1 if steadies.sum() >= 0 else -1  # 编码器方向
+    steadies = steadies * sign
+
+    moving = steadies >= 0.5
+    if moving.sum() < 2:
+        raise ValueError(f"wheel {WHEELS[wheel]}: not enough moving steps to fit")
+
+    alpha = min(max(num / den, 1e-3), 0.999)
+    slope, offset = np.polyfit(levels[moving], steadies[moving], 1)
+    return {
+        "deadband": round(float(-offset / slope), 2),      # PWM 百分比
+        "gain": round(float(slope * 100 + offset), 2),     # 100% PWM 时的 脉冲/周期
+        "slope": round(float(slope), 4),                   # 脉冲/周期 每 1% PWM
+        "tau": round(-period / math.log(1 - alpha), 4),    # 秒
+        "sign": sign,
+    }
+
+
+def check_signs(motors):
+    """
+    编码器方向必须与电机正转一致, 否则闭环是正反馈.
+    拟合时增益取了绝对值, 这里检查记录下来的方向, 有反向的轮子时报错
+    """
+    reversed_wheels = [name for name, motor in zip(WHEELS, motors) if motor["sign"] < 0]
+    if reversed_wheels:
+        raise ValueError(
+            f"encoder counts backwards on {', '.join(reversed_wheels)}: "
+            "swap that encoder's A/B wires (or the motor leads) and capture again")
+
+
+def suggest(motors, lambda_ratio):
+    """ 四个轮子共用一组 PI 参数, 按平均模型计算 """
+    slope = np.mean([m["slope"] for m in motors])
+    tau = np.mean([m["tau"] for m in motors])
+    lam = tau * lambda_ratio
+    kp = tau / (slope * lam)
+    return {"kp": round(float(kp), 4), "ki": round(float(kp / tau), 4), "kd": 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", help="sysid.bin from the car")
+    parser.add_argument("config", help="config.json to create or update")
+    parser.add_argument("--lambda-ratio", type=float, default=1.0,
+                        help="closed loop time constant / open loop time constant")
+    args = parser.parse_args()
+
+    period, data = load(args.capture)
+    motors = [fit_wheel(data, wheel, period) for wheel in range(4)]
+    try:
+        check_signs(motors)
+    except ValueError as e:
+        parser.exit(1, f"error: {e}, {args.config} not written\n")
+    pid = suggest(motors, args.lambda_ratio)
+    max_counts = round(float(np.mean([m["gain"] for m in motors])), 2)
+
+    for name, motor in zip(WHEELS, motors):
+        print(f"{name}: 死区 {motor['deadband']:5.1f}%  增益 {motor['gain']:6.2f}  时间常数 {motor['tau'] * 1000:5.1f} ms")
+    print(f"max_counts: {max_counts}  PID: {pid}")
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config) as f:
+            config = json.load(f)
+    config.setdefault("params", {}).update(pid)
+    config["max_counts"] = max_counts
+    config["motors"] = motors
+    with open(args.config, "w") as f:
+        json.dump(config, f, indent=1)
+    print(f"saved {args.config}")
+
+
+if __name__ == "__main__":
+    main()